@@ -14,11 +14,139 @@ import subprocess
 import json
 import sys
 import argparse
-from typing import Dict, List, Set, Tuple, Optional, TextIO
-from dataclasses import dataclass
-from collections import defaultdict
-
+import hashlib
+import heapq
+import os
+import re
+import selectors
+import shutil
+from itertools import chain, islice
+from pathlib import Path
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    Optional,
+    TextIO,
+    Union,
+)
+from dataclasses import dataclass, fields
+from collections import defaultdict, deque
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # Optional: the stdlib parser also accepts bytes
+    from json import loads as json_loads
+
+try:
+    import ijson
+except ImportError:  # Optional: without it brew info output is parsed in one go
+    ijson = None
+
+# Errors raised for malformed brew info output by whichever parser is in use.
+JSON_ERRORS = (json.JSONDecodeError,) + ((ijson.JSONError,) if ijson else ())
+
+# Maximum number of package names passed to a single `brew info` invocation,
+# keeping the argument list comfortably below the OS argv length limit.
+INFO_CHUNK_SIZE = 200
+
+# Number of brew subprocesses allowed to run at the same time.
+MAX_WORKERS = 16
+
+# Directory holding cached `brew info` records between runs.
+CACHE_DIR = Path.home() / ".cache" / "brewinfo"
+
+# Fields read from the formula source Homebrew keeps in each keg's .brew dir.
+FORMULA_DESC_RE = re.compile(r'^\s*desc\s+"((?:[^"\\]|\\.)*)"', re.MULTILINE)
+FORMULA_HOMEPAGE_RE = re.compile(r'^\s*homepage\s+"([^"]*)"', re.MULTILINE)
+FORMULA_BUILD_DEP_RE = re.compile(
+    r'^\s*depends_on\s+"([^"]+)"\s*=>\s*(?:\[[^\]\n]*)?:build\b', re.MULTILINE
+)
+# Platform blocks (on_linux, on_macos, on_arm, ...) and head/stable spec
+# blocks, whose dependencies only brew can resolve for the installed build.
+FORMULA_CONDITIONAL_BLOCK_RE = re.compile(
+    r"^\s*(?:on_\w+|(?:head|stable)\s+do)\b", re.MULTILINE
+)
+
+
+def _truncate(text: str, width: int) -> str:
+    """Shorten text to fit a column, marking the cut with an ellipsis."""
+    return text if len(text) <= width else text[: width - 3] + "..."
+
+
+class InfoRecordReader:
+    """Collect the package records of `brew info --json=v2` output fed in chunks.
+
+    With ijson installed each record is parsed as soon as its bytes arrive
+    from the pipe, so the raw output is never held in memory as a whole.
+    """
+
+    def __init__(self, is_cask: bool = False):
+        self.key = "casks" if is_cask else "formulae"
+        self._received = False
+        self._chunks: List[bytes] = []
+        self._error: Optional[Exception] = None
+        if ijson is not None:
+            self._records = ijson.sendable_list()
+            self._parser = ijson.items_coro(
+                self._records, f"{self.key}.item", use_float=True
+            )
 
+    def feed(self, data: bytes):
+        """Parse or buffer the next chunk of output."""
+        self._received = True
+        if ijson is None:
+            self._chunks.append(data)
+        elif self._error is None:
+            try:
+                self._parser.send(data)
+            except ijson.JSONError as e:
+                self._error = e  # Reported by records(); later chunks are moot
+
+    def discard(self):
+        """Drop the output received so far, e.g. because the command failed."""
+        self._received = False
+        self._chunks = []
+        self._error = None
+        if ijson is not None:
+            del self._records[:]
+
+    def records(self) -> List[dict]:
+        """Return the parsed records, raising if the output was malformed."""
+        if not self._received:
+            return []
+        if ijson is None:
+            return json_loads(b"".join(self._chunks)).get(self.key, [])
+        if self._error is None:
+            try:
+                self._parser.close()
+            except ijson.JSONError as e:
+                self._error = e
+        if self._error is not None:
+            raise self._error
+        return list(self._records)
+
+
+def with_slots(cls):
+    """Rebuild a dataclass so its fields live in __slots__.
+
+    Same as dataclass(slots=True), which is only available from Python 3.10.
+    """
+    field_names = tuple(field.name for field in fields(cls))
+    namespace = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in field_names + ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = field_names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@with_slots
 @dataclass
 class PackageInfo:
     """Data structure to hold package information."""
@@ -31,40 +159,128 @@ class PackageInfo:
     is_cask: bool = False
 
 
-class BrewAnalyzer:
+class BrewAnalyzer:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """Main class for analyzing Homebrew packages."""
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True, transitive: bool = False):
         self.packages: Dict[str, PackageInfo] = {}
         self.reverse_dependencies: Dict[str, Set[str]] = defaultdict(set)
-        self.installed_packages: Set[str] = set()
+        self.installed_packages: FrozenSet[str] = frozenset()
+        self.use_cache = use_cache
+        self.transitive = transitive
+        self._ancestor_cache: Dict[str, Set[str]] = {}
+        self._dep_labels: Dict[str, str] = {}
+        # Resolve brew once so each command execs it without a PATH search
+        self._brew_path = shutil.which("brew")
+        self._brew_version: Optional[str] = None
+        self._brew_dirs: Dict[str, Optional[Path]] = {}
 
     def run_brew_command(self, args: List[str]) -> str:
         """Run a brew command and return its output."""
+        return self._run_brew(args, text=True).strip()
+
+    def run_brew_command_bytes(self, args: List[str]) -> bytes:
+        """Run a brew command and return its undecoded output, e.g. for JSON."""
+        return self._run_brew(args, text=False)
+
+    def _brew_command(self, args: List[str]) -> List[str]:
+        """Return the full command line for a brew invocation."""
+        if self._brew_path is None:
+            print(
+                "Error: Homebrew not found. Please install Homebrew first.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        return [self._brew_path] + args
+
+    def _run_brew(self, args: List[str], text: bool) -> Union[str, bytes]:
+        """Run a brew command, returning empty output if it fails."""
         try:
             result = subprocess.run(
-                ["brew"] + args, capture_output=True, text=True, check=True
+                self._brew_command(args), capture_output=True, text=text, check=True
             )
-            return result.stdout.strip()
+            return result.stdout
         except subprocess.CalledProcessError as e:
             print(f"Error running brew {' '.join(args)}: {e}", file=sys.stderr)
-            return ""
-        except FileNotFoundError:
-            print(
-                "Error: Homebrew not found. Please install Homebrew first.",
-                file=sys.stderr,
+            return "" if text else b""
+
+    def get_brew_version(self) -> str:
+        """Return the Homebrew version, querying brew only once."""
+        if self._brew_version is None:
+            self._brew_version = self.run_brew_command(["--version"]).split("\n")[0]
+        return self._brew_version
+
+    def get_brew_dir(self, flag: str) -> Optional[Path]:
+        """Return a Homebrew directory such as `--cellar`, querying brew only once."""
+        if flag not in self._brew_dirs:
+            brew_dir = self.run_brew_command([flag])
+            self._brew_dirs[flag] = Path(brew_dir) if brew_dir else None
+        return self._brew_dirs[flag]
+
+    def get_install_mtime(self, package_name: str, is_cask: bool) -> Optional[float]:
+        """Return when a package was last installed, based on its receipt."""
+        brew_dir = self.get_brew_dir("--caskroom" if is_cask else "--cellar")
+        if brew_dir is None:
+            return None
+
+        if is_cask:
+            receipts = [brew_dir / package_name / ".metadata"]
+        else:
+            receipts = list((brew_dir / package_name).glob("*/INSTALL_RECEIPT.json"))
+
+        mtimes = [receipt.stat().st_mtime for receipt in receipts if receipt.exists()]
+        return max(mtimes) if mtimes else None
+
+    def _cache_path(self, package_name: str, is_cask: bool) -> Path:
+        """Return the cache file for a package under the current brew version."""
+        key = f"{package_name}|{is_cask}|{self.get_brew_version()}"
+        return CACHE_DIR / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+    def load_cached_info(self, package_name: str, is_cask: bool) -> Optional[dict]:
+        """Return the cached brew info record for a package if it is still fresh."""
+        cache_path = self._cache_path(package_name, is_cask)
+        try:
+            installed_at = self.get_install_mtime(package_name, is_cask)
+            if installed_at is None or cache_path.stat().st_mtime < installed_at:
+                return None
+            return json_loads(cache_path.read_bytes())
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def store_cached_info(self, record: dict, is_cask: bool):
+        """Save a brew info record so later runs can skip querying brew."""
+        package_name = record["token"] if is_cask else record["name"]
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            self._cache_path(package_name, is_cask).write_text(
+                json.dumps(record), encoding="utf-8"
+            )
+        except OSError as e:
+            print(f"Error caching info for {package_name}: {e}", file=sys.stderr)
+
+    def list_brew_dir(self, flag: str, list_flag: str) -> List[str]:
+        """List the packages installed in a Homebrew directory like the Cellar."""
+        brew_dir = self.get_brew_dir(flag)
+        if brew_dir is None:
+            # Location unknown, so let brew list the packages itself
+            output = self.run_brew_command(["list", list_flag])
+            return output.split("\n") if output else []
+
+        if not brew_dir.is_dir():
+            return []
+
+        with os.scandir(brew_dir) as entries:
+            return sorted(
+                entry.name
+                for entry in entries
+                if entry.is_dir() and not entry.name.startswith(".")
             )
-            sys.exit(1)
 
     def get_installed_packages(self) -> List[Tuple[str, bool]]:
         """Get list of all installed packages and casks."""
-        # Get regular packages
-        packages_output = self.run_brew_command(["list", "--formula"])
-        packages = packages_output.split("\n") if packages_output else []
-
-        # Get casks
-        casks_output = self.run_brew_command(["list", "--cask"])
-        casks = casks_output.split("\n") if casks_output else []
+        # Each installed package is a directory in the Cellar or Caskroom
+        packages = self.list_brew_dir("--cellar", "--formula")
+        casks = self.list_brew_dir("--caskroom", "--cask")
 
         # Mark casks for later identification
         all_packages = [(pkg, False) for pkg in packages if pkg] + [
@@ -73,62 +289,339 @@ class BrewAnalyzer:
 
         return all_packages
 
+    def parse_brew_info_records(
+        self, records: Iterable[dict], is_cask: bool = False
+    ) -> List[PackageInfo]:
+        """Build PackageInfo entries from a list of brew info JSON records."""
+        # Names recur across many dependency lists; interning them shares one
+        # string object, so set and dict lookups succeed on the identity check
+        intern = sys.intern
+        packages = []
+        for pkg_data in records:
+            if is_cask:
+                # Handle cask data structure
+                name = intern(pkg_data["token"])
+                build_deps = []
+                runtime_deps = []
+            else:
+                # Handle formula data structure
+                name = intern(pkg_data["name"])
+                build_deps = [
+                    intern(dep) for dep in pkg_data.get("build_dependencies", [])
+                ]
+                runtime_deps = [intern(dep) for dep in pkg_data.get("dependencies", [])]
+
+            packages.append(
+                PackageInfo(
+                    name=name,
+                    # Casks without a description report "desc": null
+                    description=pkg_data.get("desc") or "No description available",
+                    url=pkg_data.get("homepage") or "",
+                    build_dependencies=build_deps,
+                    runtime_dependencies=runtime_deps,
+                    is_cask=is_cask,
+                )
+            )
+
+        return packages
+
+    def _info_args(self, names: List[str], is_cask: bool = False) -> List[str]:
+        """Return the brew arguments querying JSON info for some packages."""
+        return ["info", "--json=v2", "--cask" if is_cask else "--formula"] + names
+
+    def _info_records(
+        self, info_output: bytes, is_cask: bool = False
+    ) -> Iterator[dict]:
+        """Yield the package records from `brew info --json=v2` output."""
+        if not info_output:
+            return
+
+        key = "casks" if is_cask else "formulae"
+        yield from self._stored_records(json_loads(info_output).get(key, []), is_cask)
+
+    def _stored_records(
+        self, records: Iterable[dict], is_cask: bool = False
+    ) -> Iterator[dict]:
+        """Yield brew info records, saving each to the disk cache if enabled."""
+        for record in records:
+            if self.use_cache:
+                self.store_cached_info(record, is_cask)
+            yield record
+
+    def run_brew_commands_batched(  # pylint: disable=too-many-locals,too-many-branches
+        self,
+        arg_lists: List[List[str]],
+        label: str = "packages",
+        readers: Optional[List[InfoRecordReader]] = None,
+    ) -> List[bytes]:
+        """Run several brew commands concurrently and return their raw outputs.
+
+        When readers are given, each command's output is fed to its reader as
+        it arrives instead of being collected, and its entry stays empty.
+        """
+        outputs = [b""] * len(arg_lists)
+        queued = deque(enumerate(arg_lists))
+        running: Dict[int, subprocess.Popen] = {}
+        chunks: Dict[int, List[bytes]] = defaultdict(list)
+        selector = selectors.DefaultSelector()
+        done = 0
+
+        def start_next():
+            index, args = queued.popleft()
+            proc = subprocess.Popen(  # pylint: disable=consider-using-with
+                self._brew_command(args),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            running[index] = proc
+            selector.register(proc.stdout, selectors.EVENT_READ, index)
+
+        try:
+            while queued and len(running) < MAX_WORKERS:
+                start_next()
+
+            # One select() wakes us for every pipe with data, however many run
+            while running:
+                for key, _ in selector.select():
+                    index = key.data
+                    data = os.read(key.fd, 65536)
+                    if data:
+                        if readers:
+                            readers[index].feed(data)
+                        else:
+                            chunks[index].append(data)
+                        continue
+
+                    # EOF: the process is done writing, so reap it
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+                    proc = running.pop(index)
+                    args = arg_lists[index]
+                    if proc.wait():
+                        e = subprocess.CalledProcessError(proc.returncode, proc.args)
+                        print(
+                            f"Error running brew {' '.join(args)}: {e}", file=sys.stderr
+                        )
+                        if readers:
+                            readers[index].discard()
+                    else:
+                        outputs[index] = b"".join(chunks[index])
+                    chunks.pop(index, None)
+
+                    # Report every 10th result to keep terminal writes cheap
+                    done += 1
+                    if done % 10 == 0 or done == len(arg_lists):
+                        sys.stdout.write(
+                            f"\rAnalyzing {label} ({done}/{len(arg_lists)})...\033[K"
+                        )
+                        sys.stdout.flush()
+
+                    if queued:
+                        start_next()
+        finally:
+            for proc in running.values():
+                proc.kill()
+            selector.close()
+
+        return outputs
+
     def parse_brew_info(
         self, package_name: str, is_cask: bool = False
     ) -> Optional[PackageInfo]:
         """Parse brew info output for a package."""
-        info_args = ["info", "--json"]
-        if is_cask:
-            info_args.append("--cask")
-        info_args.append(package_name)
+        info_output = self.run_brew_command_bytes(
+            self._info_args([package_name], is_cask)
+        )
+        return self.parse_brew_info_output(package_name, info_output, is_cask)
 
-        info_output = self.run_brew_command(info_args)
-        if not info_output:
+    def parse_brew_info_output(
+        self, package_name: str, info_output: bytes, is_cask: bool = False
+    ) -> Optional[PackageInfo]:
+        """Parse already fetched brew info output for a package."""
+        try:
+            records = islice(self._info_records(info_output, is_cask), 1)
+            packages = self.parse_brew_info_records(records, is_cask)
+            return packages[0] if packages else None
+
+        except (json.JSONDecodeError, KeyError) as e:
+            print(f"Error parsing info for {package_name}: {e}", file=sys.stderr)
             return None
 
-        try:
-            info_data = json.loads(info_output)
-            if not info_data:
-                return None
+    def parse_brew_info_bulk(
+        self, names: List[str], is_cask: bool = False
+    ) -> List[PackageInfo]:
+        """Parse brew info for many packages using as few brew calls as possible."""
+        names_iter = iter(names)
+        chunks = list(iter(lambda: list(islice(names_iter, INFO_CHUNK_SIZE)), []))
+        # Records are parsed while the brew pipes drain, not after
+        readers = [InfoRecordReader(is_cask) for _ in chunks]
+        self.run_brew_commands_batched(
+            [self._info_args(chunk, is_cask) for chunk in chunks],
+            label="casks" if is_cask else "formulae",
+            readers=readers,
+        )
 
-            pkg_data = info_data[0]
+        results = []
+        for reader in readers:
+            try:
+                records = self._stored_records(reader.records(), is_cask)
+                results.extend(self.parse_brew_info_records(records, is_cask))
+            except JSON_ERRORS + (KeyError,) as e:
+                print(f"Error parsing batch info: {e}", file=sys.stderr)
 
-            if is_cask:
-                # Handle cask data structure
-                description = pkg_data.get("desc", "No description available")
-                url = pkg_data.get("homepage", "")
-                build_deps = []
-                runtime_deps = []
-            else:
-                # Handle formula data structure
-                description = pkg_data.get("desc", "No description available")
-                url = pkg_data.get("homepage", "")
-                build_deps = pkg_data.get("build_dependencies", [])
-                runtime_deps = pkg_data.get("dependencies", [])
-
-            return PackageInfo(
-                name=package_name,
-                description=description,
-                url=url,
-                build_dependencies=build_deps,
-                runtime_dependencies=runtime_deps,
-                is_cask=is_cask,
+        return results
+
+    def read_formula_keg(self, formula_dir: Path) -> Optional[PackageInfo]:
+        """Read package info for an installed formula directly from the Cellar."""
+        receipts = sorted(
+            formula_dir.glob("*/INSTALL_RECEIPT.json"), key=lambda p: p.stat().st_mtime
+        )
+        if not receipts:
+            return None
+
+        keg = receipts[-1].parent
+        try:
+            receipt = json_loads(receipts[-1].read_bytes())
+            formula_source = (keg / ".brew" / f"{formula_dir.name}.rb").read_text(
+                encoding="utf-8"
             )
+        except (OSError, json.JSONDecodeError):
+            return None
 
-        except (json.JSONDecodeError, KeyError, IndexError) as e:
-            print(f"Error parsing info for {package_name}: {e}", file=sys.stderr)
+        # Older receipts lack runtime deps or don't mark which were declared
+        runtime_deps = receipt.get("runtime_dependencies")
+        desc_match = FORMULA_DESC_RE.search(formula_source)
+        if (
+            not desc_match
+            or runtime_deps is None
+            or FORMULA_CONDITIONAL_BLOCK_RE.search(formula_source)
+        ):
+            return None
+        if any("declared_directly" not in dep for dep in runtime_deps):
             return None
 
+        homepage_match = FORMULA_HOMEPAGE_RE.search(formula_source)
+        return PackageInfo(
+            name=sys.intern(formula_dir.name),
+            description=desc_match.group(1).replace('\\"', '"'),
+            url=homepage_match.group(1) if homepage_match else "",
+            build_dependencies=[
+                sys.intern(dep) for dep in FORMULA_BUILD_DEP_RE.findall(formula_source)
+            ],
+            runtime_dependencies=[
+                sys.intern(dep["full_name"])
+                for dep in runtime_deps
+                if dep["declared_directly"]
+            ],
+            is_cask=False,
+        )
+
+    def _read_cask_metadata(self, cask_name: str) -> Optional[dict]:
+        """Read the cask JSON Homebrew saved when the cask was installed."""
+        caskroom = self.get_brew_dir("--caskroom")
+        if caskroom is None:
+            return None
+
+        # Laid out as .metadata/<version>/<timestamp>/Casks/<token>.json
+        metadata_files = sorted(
+            (caskroom / cask_name / ".metadata").glob(f"*/*/Casks/{cask_name}.json"),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for metadata_file in metadata_files:
+            try:
+                record = json_loads(metadata_file.read_bytes())
+            except (OSError, json.JSONDecodeError):
+                continue
+            if isinstance(record, dict) and record.get("token") == cask_name:
+                return record
+
+        return None
+
+    def _discover_installed_via_cellar(self) -> Dict[str, PackageInfo]:
+        """Collect formula info from install receipts without running brew info."""
+        cellar = self.get_brew_dir("--cellar")
+        if cellar is None or not cellar.is_dir():
+            return {}
+
+        packages = {}
+        for formula_dir in cellar.iterdir():
+            if formula_dir.name.startswith(".") or not formula_dir.is_dir():
+                continue
+            pkg_info = self.read_formula_keg(formula_dir)
+            if pkg_info:
+                packages[pkg_info.name] = pkg_info
+
+        return packages
+
     def build_reverse_dependencies(self):
         """Build reverse dependency mapping."""
+        reverse_dependencies = self.reverse_dependencies
         for pkg_name, pkg_info in self.packages.items():
-            # Add reverse dependencies for build dependencies
-            for dep in pkg_info.build_dependencies:
-                self.reverse_dependencies[dep].add(pkg_name)
-
-            # Add reverse dependencies for runtime dependencies
-            for dep in pkg_info.runtime_dependencies:
-                self.reverse_dependencies[dep].add(pkg_name)
+            # Build and runtime dependencies both count as users of the dep
+            for dep in chain(
+                pkg_info.build_dependencies, pkg_info.runtime_dependencies
+            ):
+                reverse_dependencies[dep].add(pkg_name)
+
+        # Transitive users depend on the direct ones, so recompute them later
+        self._ancestor_cache = {}
+
+    def compute_transitive_users(  # pylint: disable=too-many-locals,too-many-branches
+        self,
+    ) -> Dict[str, Set[str]]:
+        """Map each package to all packages that depend on it, directly or not."""
+        cache = self._ancestor_cache
+        direct_users = self.reverse_dependencies
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        component: List[str] = []
+        on_component: Set[str] = set()
+
+        def visit(node: str):
+            index[node] = lowlink[node] = len(index)
+            component.append(node)
+            on_component.add(node)
+            stack.append((node, iter(direct_users.get(node, ()))))
+
+        for root in self.packages:
+            if root in cache or root in index:
+                continue
+
+            # Iterative Tarjan so deep dependency chains can't hit the recursion
+            # limit. Packages in a cycle form one strongly connected component
+            # and share its users; a component is done once all of its users are
+            stack: List[Tuple[str, Iterator[str]]] = []
+            visit(root)
+            while stack:
+                node, pending_users = stack[-1]
+                for user in pending_users:
+                    if user not in index and user not in cache:
+                        visit(user)
+                        break
+                    if user in on_component:
+                        lowlink[node] = min(lowlink[node], index[user])
+                else:
+                    stack.pop()
+                    if stack:
+                        parent = stack[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] != index[node]:
+                        continue
+
+                    members = []
+                    while not members or members[-1] != node:
+                        members.append(component.pop())
+                        on_component.discard(members[-1])
+                    users = set()
+                    for member in members:
+                        for user in direct_users.get(member, ()):
+                            users.add(user)
+                            users.update(cache.get(user, ()))
+                    for member in members:
+                        cache[member] = users
+
+        return cache
 
     def check_dependency_status(self, dep_name: str) -> str:
         """Check if a dependency is installed and return status symbol."""
@@ -136,19 +629,28 @@ class BrewAnalyzer:
             return "✅"  # Green check
         return "❌"  # Red X
 
-    def format_dependencies(self, dependencies: List[str]) -> str:
-        """Format dependencies with status indicators."""
-        if not dependencies:
-            return ""
+    def build_dependency_labels(self):
+        """Precompute the status-prefixed label shown for each dependency."""
+        all_deps = set()
+        for pkg_info in self.packages.values():
+            all_deps.update(pkg_info.build_dependencies)
+            all_deps.update(pkg_info.runtime_dependencies)
 
-        formatted_deps = []
-        for dep in dependencies:
-            status = self.check_dependency_status(dep)
-            formatted_deps.append(f"{status} {dep}")
+        installed = self.installed_packages
+        self._dep_labels = {
+            dep: ("✅ " if dep in installed else "❌ ") + dep for dep in all_deps
+        }
 
-        return ", ".join(formatted_deps)
+    def format_dependencies(self, dependencies: List[str]) -> str:
+        """Format dependencies with status indicators."""
+        labels = self._dep_labels
+        installed = self.installed_packages
+        return ", ".join(
+            labels.get(dep) or ("✅ " if dep in installed else "❌ ") + dep
+            for dep in dependencies
+        )
 
-    def analyze_packages(self):
+    def analyze_packages(self):  # pylint: disable=too-many-branches
         """Main method to analyze all packages."""
         print("Getting list of installed packages...")
         installed_list = self.get_installed_packages()
@@ -158,101 +660,134 @@ class BrewAnalyzer:
             return
 
         # Build set of installed package names for dependency checking
-        self.installed_packages = {pkg[0] for pkg in installed_list}
+        self.installed_packages = frozenset(
+            sys.intern(pkg[0]) for pkg in installed_list
+        )
 
         print(f"Found {len(installed_list)} packages. Analyzing...")
 
-        # Get detailed info for each package
-        for i, (package_name, is_cask) in enumerate(installed_list, 1):
-            print(f"Analyzing {package_name} ({i}/{len(installed_list)})...", end="\r")
-            print("\033[K", end="")  # Clear rest of line
+        # Read what we can from the Cellar and Caskroom, without brew info
+        for package_name, pkg_info in self._discover_installed_via_cellar().items():
+            if package_name in self.installed_packages:
+                self.packages[package_name] = pkg_info
+
+        for package_name, is_cask in installed_list:
+            record = self._read_cask_metadata(package_name) if is_cask else None
+            if record:
+                pkg_info = self.parse_brew_info_records([record], is_cask)[0]
+                self.packages[package_name] = pkg_info
 
-            pkg_info = self.parse_brew_info(package_name, is_cask)
+        # Reuse cached info for packages that have not changed since last run
+        if self.use_cache:
+            for package_name, is_cask in installed_list:
+                if package_name in self.packages:
+                    continue
+                record = self.load_cached_info(package_name, is_cask)
+                if record:
+                    pkg_info = self.parse_brew_info_records([record], is_cask)[0]
+                    self.packages[package_name] = pkg_info
+
+        pending = [pkg for pkg in installed_list if pkg[0] not in self.packages]
+        formula_names = [name for name, is_cask in pending if not is_cask]
+        cask_names = [name for name, is_cask in pending if is_cask]
+
+        # Get detailed info using one brew call per chunk of packages
+        for names, is_cask in ((formula_names, False), (cask_names, True)):
+            for pkg_info in self.parse_brew_info_bulk(names, is_cask):
+                self.packages[pkg_info.name] = pkg_info
+
+        # A single unknown name fails the whole bulk call, so query any
+        # packages that are still missing one at a time
+        missing = [pkg for pkg in installed_list if pkg[0] not in self.packages]
+        outputs = self.run_brew_commands_batched(
+            [self._info_args([name], is_cask) for name, is_cask in missing]
+        )
+        for (package_name, is_cask), info_output in zip(missing, outputs):
+            pkg_info = self.parse_brew_info_output(package_name, info_output, is_cask)
             if pkg_info:
                 self.packages[package_name] = pkg_info
 
         print("\nBuilding dependency relationships...")
         self.build_reverse_dependencies()
+        self.build_dependency_labels()
+
+        # Keep packages in name order so output can iterate them directly
+        self.packages = dict(sorted(self.packages.items()))
 
         print("Analysis complete!\n")
 
-    def print_table(self, output_file: Optional[TextIO] = None):
+    def print_table(
+        self, output_file: Optional[TextIO] = None
+    ):  # pylint: disable=too-many-locals,consider-using-max-builtin
         """Print the results in a formatted table."""
         if not self.packages:
             print("No package information available.")
             return
 
-        # Calculate column widths
-        max_name_width = max(len(pkg.name) for pkg in self.packages.values())
-        max_desc_width = min(
-            50, max(len(pkg.description) for pkg in self.packages.values())
-        )
+        # Calculate column widths in a single pass, starting from the minimums
+        max_name_width = 12
+        max_desc_width = 20
+        for pkg in self.packages.values():
+            name_width = len(pkg.name)
+            if name_width > max_name_width:
+                max_name_width = name_width
+            desc_width = len(pkg.description)
+            if desc_width > max_desc_width:
+                max_desc_width = desc_width
+        max_desc_width = min(50, max_desc_width)
         max_reverse_deps_width = 30
         max_build_deps_width = 40
         max_runtime_deps_width = 40
 
-        # Ensure minimum widths
-        max_name_width = max(max_name_width, 12)
-        max_desc_width = max(max_desc_width, 20)
+        # One format template serves the header and every row
+        row_template = (
+            f"{{:<{max_name_width}}} | "
+            f"{{:<{max_desc_width}}} | "
+            f"{{:<{max_reverse_deps_width}}} | "
+            f"{{:<{max_build_deps_width}}} | "
+            f"{{:<{max_runtime_deps_width}}}"
+        )
 
         # Print header
-        header = (
-            f"{'Package':<{max_name_width}} | "
-            f"{'Description':<{max_desc_width}} | "
-            f"{'Used By':<{max_reverse_deps_width}} | "
-            f"{'Build Deps':<{max_build_deps_width}} | "
-            f"{'Runtime Deps':<{max_runtime_deps_width}}"
+        header = row_template.format(
+            "Package", "Description", "Used By", "Build Deps", "Runtime Deps"
         )
-        print(header)
-        print("-" * len(header))
+        lines = [header, "-" * len(header)]
 
-        if output_file:
-            print(header, file=output_file)
-            print("-" * len(header), file=output_file)
-
-        # Print package information
-        for pkg_name in sorted(self.packages.keys()):
-            pkg_info = self.packages[pkg_name]
+        if self.transitive:
+            users_by_package = self.compute_transitive_users()
+        else:
+            users_by_package = self.reverse_dependencies
 
-            # Truncate description if too long
-            description = pkg_info.description
-            if len(description) > max_desc_width:
-                description = description[: max_desc_width - 3] + "..."
+        # Print package information, already sorted by analyze_packages
+        for pkg_name, pkg_info in self.packages.items():
 
-            # Format reverse dependencies
-            reverse_deps = list(self.reverse_dependencies.get(pkg_name, set()))
-            reverse_deps_str = ", ".join(reverse_deps[:3])  # Show first 3
+            # Format reverse dependencies, showing the first 3 alphabetically
+            reverse_deps = users_by_package.get(pkg_name, ())
+            reverse_deps_str = ", ".join(heapq.nsmallest(3, reverse_deps))
             if len(reverse_deps) > 3:
                 reverse_deps_str += f" (+{len(reverse_deps)-3} more)"
-            if len(reverse_deps_str) > max_reverse_deps_width:
-                reverse_deps_str = (
-                    reverse_deps_str[: max_reverse_deps_width - 3] + "..."
-                )
-
-            # Format build dependencies
-            build_deps_str = self.format_dependencies(pkg_info.build_dependencies)
-            if len(build_deps_str) > max_build_deps_width:
-                build_deps_str = build_deps_str[: max_build_deps_width - 3] + "..."
-
-            # Format runtime dependencies
-            runtime_deps_str = self.format_dependencies(pkg_info.runtime_dependencies)
-            if len(runtime_deps_str) > max_runtime_deps_width:
-                runtime_deps_str = (
-                    runtime_deps_str[: max_runtime_deps_width - 3] + "..."
-                )
 
-            # Print row
-            row = (
-                f"{pkg_name:<{max_name_width}} | "
-                f"{description:<{max_desc_width}} | "
-                f"{reverse_deps_str:<{max_reverse_deps_width}} | "
-                f"{build_deps_str:<{max_build_deps_width}} | "
-                f"{runtime_deps_str:<{max_runtime_deps_width}}"
+            row = row_template.format(
+                pkg_name,
+                _truncate(pkg_info.description, max_desc_width),
+                _truncate(reverse_deps_str, max_reverse_deps_width),
+                _truncate(
+                    self.format_dependencies(pkg_info.build_dependencies),
+                    max_build_deps_width,
+                ),
+                _truncate(
+                    self.format_dependencies(pkg_info.runtime_dependencies),
+                    max_runtime_deps_width,
+                ),
             )
-            print(row)
+            lines.append(row)
 
-            if output_file:
-                print(row, file=output_file)
+        # Emit the whole table with one write per stream
+        table = "\n".join(lines) + "\n"
+        sys.stdout.write(table)
+        if output_file:
+            output_file.write(table)
 
     def print_summary(self, output_file: Optional[TextIO] = None):
         """Print summary statistics."""
@@ -267,22 +802,17 @@ class BrewAnalyzer:
             len(pkg.runtime_dependencies) for pkg in self.packages.values()
         )
 
-        print("\nSummary:")
-        print(f"  Total packages: {total_packages}")
-        print(f"  Formulas: {formula_count}")
-        print(f"  Casks: {cask_count}")
-        print(f"  Total build dependencies: {total_build_deps}")
-        print(f"  Total runtime dependencies: {total_runtime_deps}")
-
+        summary = (
+            "\nSummary:\n"
+            f"  Total packages: {total_packages}\n"
+            f"  Formulas: {formula_count}\n"
+            f"  Casks: {cask_count}\n"
+            f"  Total build dependencies: {total_build_deps}\n"
+            f"  Total runtime dependencies: {total_runtime_deps}\n"
+        )
+        sys.stdout.write(summary)
         if output_file:
-            print("\nSummary:", file=output_file)
-            print(f"  Total packages: {total_packages}", file=output_file)
-            print(f"  Formulas: {formula_count}", file=output_file)
-            print(f"  Casks: {cask_count}", file=output_file)
-            print(f"  Total build dependencies: {total_build_deps}", file=output_file)
-            print(
-                f"  Total runtime dependencies: {total_runtime_deps}", file=output_file
-            )
+            output_file.write(summary)
 
 
 def main():
@@ -296,9 +826,19 @@ def main():
         type=str,
         help="Output file to save the table (in addition to console output)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Do not read or write cached package info in {CACHE_DIR}",
+    )
+    parser.add_argument(
+        "--transitive",
+        action="store_true",
+        help="List indirect users too in the Used By column",
+    )
 
     args = parser.parse_args()
-    analyzer = BrewAnalyzer()
+    analyzer = BrewAnalyzer(use_cache=not args.no_cache, transitive=args.transitive)
     output_file = None
 
     try:
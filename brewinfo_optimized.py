@@ -16,15 +16,133 @@ import subprocess
 import json
 import sys
 import argparse
+import contextlib
+import errno
+import io
+import os
+import re
 import time
-from typing import Dict, List, Set, Tuple, Optional, TextIO
-from dataclasses import dataclass
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Set, Tuple, Optional, TextIO
+from dataclasses import dataclass, fields
+from collections import defaultdict, deque
 
 import requests
 
+try:
+    from graphlib import CycleError, TopologicalSorter
+except ImportError:  # Python 3.8: topo_order uses its own Kahn's algorithm
+    CycleError = TopologicalSorter = None
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # Optional: the stdlib parser also accepts bytes
+    from json import loads as json_loads
+
+try:
+    import ijson
+except ImportError:  # Optional: without it API responses are parsed in one go
+    ijson = None
+
+# Errors raised while downloading or decoding Homebrew API responses.
+API_ERRORS = (requests.RequestException, json.JSONDecodeError) + (
+    (ijson.JSONError,) if ijson else ()
+)
+
+FORMULA_API_URL = "https://formulae.brew.sh/api/formula.json"
+CASK_API_URL = "https://formulae.brew.sh/api/cask.json"
+API_CACHE_DIR = Path.home() / ".cache" / "brewinfo" / "api"
+API_CHUNK_SIZE = 64 * 1024
+
+# Fields of an API record that are read when building PackageInfo objects.
+API_FIELDS = ("name", "token", "desc", "homepage", "build_dependencies", "dependencies")
+
+# Fields read from the formula source Homebrew keeps in each keg's .brew dir.
+FORMULA_DESC_RE = re.compile(r'^\s*desc\s+"((?:[^"\\]|\\.)*)"', re.MULTILINE)
+FORMULA_HOMEPAGE_RE = re.compile(r'^\s*homepage\s+"([^"]*)"', re.MULTILINE)
+FORMULA_BUILD_DEP_RE = re.compile(
+    r'^\s*depends_on\s+"([^"]+)"\s*=>\s*(?:\[[^\]\n]*)?:build\b', re.MULTILINE
+)
+# Platform blocks (on_linux, on_macos, on_arm, ...) and head/stable spec
+# blocks, whose dependencies only brew can resolve for the installed build.
+FORMULA_CONDITIONAL_BLOCK_RE = re.compile(
+    r"^\s*(?:on_\w+|(?:head|stable)\s+do)\b", re.MULTILINE
+)
+
+
+def _truncate(text: str, width: int) -> str:
+    """Shorten text to fit a column, marking the cut with an ellipsis."""
+    return text if len(text) <= width else text[: width - 3] + "..."
+
+
+def max_argv_bytes() -> int:
+    """Return how many bytes of command-line arguments a new process may receive."""
+    try:
+        arg_max = os.sysconf("SC_ARG_MAX")
+    except (AttributeError, ValueError, OSError):
+        arg_max = 0
+    if arg_max <= 0:
+        # Unknown limit: assume the lowest that Linux or macOS will report
+        arg_max = 128 * 1024
+
+    # The environment shares the same limit; keep some slack for the brew path
+    environment = sum(len(key) + len(value) + 2 for key, value in os.environ.items())
+    return max(arg_max - environment - 4096, 4096)
+
+
+class _Tee:  # pylint: disable=too-few-public-methods
+    """Write-only stream that copies everything written to several streams."""
+
+    def __init__(self, *streams: TextIO):
+        self.streams = streams
+
+    def write(self, text: str):
+        """Write text to every stream."""
+        for stream in self.streams:
+            stream.write(text)
+
+
+def _tee_stdout(output_file: Optional[TextIO]):
+    """Return a stream writing to stdout and, if given, the output file."""
+    return _Tee(sys.stdout, output_file) if output_file else sys.stdout
+
+
+def _dataclass_getstate(self):
+    """Return field values in declaration order for pickling."""
+    return [getattr(self, field.name) for field in fields(self)]
+
+
+def _dataclass_setstate(self, state):
+    """Restore field values, bypassing the frozen __setattr__."""
+    for field, value in zip(fields(self), state):
+        object.__setattr__(self, field.name, value)
+
 
-@dataclass
+def with_slots(cls):
+    """Rebuild a dataclass so its fields live in __slots__.
+
+    Same as dataclass(slots=True), which is only available from Python 3.10.
+    """
+    field_names = tuple(field.name for field in fields(cls))
+    namespace = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in field_names + ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = field_names
+    if cls.__dataclass_params__.frozen:
+        # Frozen instances reject setattr, which default unpickling relies on
+        namespace["__getstate__"] = _dataclass_getstate
+        namespace["__setstate__"] = _dataclass_setstate
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@with_slots
+@dataclass(frozen=True)
 class PackageInfo:
     """Data structure to hold package information."""
 
@@ -36,27 +154,110 @@ class PackageInfo:
     is_cask: bool = False
 
 
-class OptimizedBrewAnalyzer:
+class OptimizedBrewAnalyzer:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """Optimized analyzer for Homebrew packages."""
 
     def __init__(self, use_api: bool = False, batch_size: int = 50):
-        self.packages: Dict[str, PackageInfo] = {}
+        # Package data is stored column by column, keyed by package name
+        self.descriptions: Dict[str, str] = {}
+        self.urls: Dict[str, str] = {}
+        self.build_deps: Dict[str, List[str]] = {}
+        self.runtime_deps: Dict[str, List[str]] = {}
+        self.cask_packages: Set[str] = set()
+        self._formatted_build_deps: Dict[str, str] = {}
+        self._formatted_runtime_deps: Dict[str, str] = {}
+        self._topo_order: Optional[Tuple[str, ...]] = None
+        self._packages: Optional[Dict[str, PackageInfo]] = None
         self.reverse_dependencies: Dict[str, Set[str]] = defaultdict(set)
         self.installed_packages: Set[str] = set()
         self.use_api = use_api
         self.batch_size = batch_size
         self._api_cache = {}
-
-    def run_brew_command(self, args: List[str]) -> str:
-        """Run a brew command and return its output."""
+        self._brew_prefix: Optional[str] = None
+
+    @property
+    def packages(self) -> Dict[str, PackageInfo]:
+        """Package records rebuilt from the column stores."""
+        if self._packages is None:
+            self._packages = {
+                name: PackageInfo(
+                    name=name,
+                    description=description,
+                    url=self.urls[name],
+                    build_dependencies=self.build_deps[name],
+                    runtime_dependencies=self.runtime_deps[name],
+                    is_cask=name in self.cask_packages,
+                )
+                for name, description in self.descriptions.items()
+            }
+        return self._packages
+
+    @property
+    def topo_order(self) -> Tuple[str, ...]:
+        """Analyzed packages ordered so each comes after its installed dependencies."""
+        if self._topo_order is None:
+            self._topo_order = self.topological_order()
+        return self._topo_order
+
+    def topological_order(self) -> Tuple[str, ...]:
+        """Sort analyzed packages so dependencies precede the packages using them."""
+        known = self.descriptions.keys()
+        graph = {
+            name: known & set(chain(self.build_deps[name], self.runtime_deps[name]))
+            for name in self.descriptions
+        }
+        if TopologicalSorter is not None:
+            try:
+                return tuple(TopologicalSorter(graph).static_order())
+            except CycleError:
+                pass  # Fall through so cyclic packages still get a place
+
+        # Kahn's algorithm, with packages caught in a cycle appended at the end
+        users = defaultdict(list)
+        for name, deps in graph.items():
+            for dep in deps:
+                users[dep].append(name)
+        waiting = {name: len(deps) for name, deps in graph.items()}
+        ready = deque(name for name, count in waiting.items() if count == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for user in users[name]:
+                waiting[user] -= 1
+                if waiting[user] == 0:
+                    ready.append(user)
+        placed = set(order)
+        order.extend(sorted(name for name in graph if name not in placed))
+        return tuple(order)
+
+    def add_package(self, pkg_info: PackageInfo):
+        """Store a parsed package and record it as a user of its dependencies."""
+        name = pkg_info.name
+        self.descriptions[name] = pkg_info.description
+        self.urls[name] = pkg_info.url
+        self.build_deps[name] = pkg_info.build_dependencies
+        self.runtime_deps[name] = pkg_info.runtime_dependencies
+        if pkg_info.is_cask:
+            self.cask_packages.add(name)
+        self._topo_order = None
+        self._packages = None
+        self._formatted_build_deps = {}
+        self._formatted_runtime_deps = {}
+
+        # Fill in reverse dependencies while the lists are at hand
+        reverse_dependencies = self.reverse_dependencies
+        for dep in chain(pkg_info.build_dependencies, pkg_info.runtime_dependencies):
+            reverse_dependencies[dep].add(name)
+
+    def start_brew_command(self, args: List[str]) -> subprocess.Popen:
+        """Start a brew command without waiting for it to finish."""
         try:
-            result = subprocess.run(
-                ["brew"] + args, capture_output=True, text=True, check=True
+            return subprocess.Popen(  # pylint: disable=consider-using-with
+                ["brew"] + args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
             )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            print(f"Error running brew {' '.join(args)}: {e}", file=sys.stderr)
-            return ""
         except FileNotFoundError:
             print(
                 "Error: Homebrew not found. Please install Homebrew first.",
@@ -64,24 +265,144 @@ class OptimizedBrewAnalyzer:
             )
             sys.exit(1)
 
+    def finish_brew_command(self, process: subprocess.Popen) -> bytes:
+        """Wait for a started brew command and return its raw output."""
+        stdout, stderr = process.communicate()
+        if process.returncode != 0:
+            e = subprocess.CalledProcessError(
+                process.returncode, process.args, stdout, stderr
+            )
+            print(
+                f"Error running brew {' '.join(process.args[1:])}: {e}", file=sys.stderr
+            )
+            return b""
+        return stdout
+
+    def run_brew_command(self, args: List[str]) -> str:
+        """Run a brew command and return its output."""
+        return self.finish_brew_command(self.start_brew_command(args)).decode().strip()
+
+    def get_brew_prefix(self) -> str:
+        """Return the Homebrew prefix, querying brew only once."""
+        if self._brew_prefix is None:
+            self._brew_prefix = os.environ.get(
+                "HOMEBREW_PREFIX"
+            ) or self.run_brew_command(["--prefix"])
+        return self._brew_prefix
+
+    def list_brew_dir(self, subdir: str, list_flag: str) -> List[str]:
+        """List the packages installed in a Homebrew directory like the Cellar."""
+        prefix = self.get_brew_prefix()
+        if prefix:
+            try:
+                with os.scandir(os.path.join(prefix, subdir)) as entries:
+                    return sorted(
+                        entry.name
+                        for entry in entries
+                        if entry.is_dir() and not entry.name.startswith(".")
+                    )
+            except OSError:
+                pass
+
+        # Directory not found, so let brew list the packages itself
+        return self.run_brew_command(["list", list_flag]).splitlines()
+
     def get_installed_packages(self) -> List[Tuple[str, bool]]:
         """Get list of all installed packages and casks."""
-        # Get regular packages
-        packages_output = self.run_brew_command(["list", "--formula"])
-        packages = packages_output.split("\n") if packages_output else []
+        # Each installed package is a directory in the Cellar or Caskroom
+        packages = self.list_brew_dir("Cellar", "--formula")
+        casks = self.list_brew_dir("Caskroom", "--cask")
 
-        # Get casks
-        casks_output = self.run_brew_command(["list", "--cask"])
-        casks = casks_output.split("\n") if casks_output else []
+        # Mark casks for later identification, building a single list
+        all_packages = [(pkg, False) for pkg in packages if pkg]
+        all_packages.extend((cask, True) for cask in casks if cask)
+        return all_packages
 
-        # Mark casks for later identification
-        all_packages = [(pkg, False) for pkg in packages if pkg] + [
-            (cask, True) for cask in casks if cask
-        ]
+    @staticmethod
+    def open_api_response(url: str) -> BinaryIO:
+        """Open an API endpoint body, reusing the disk copy while it is current."""
+        cache_path = API_CACHE_DIR / url.rsplit("/", 1)[-1]
+        etag_path = cache_path.with_suffix(".etag")
 
-        return all_packages
+        headers = {}
+        try:
+            headers["If-Modified-Since"] = formatdate(
+                cache_path.stat().st_mtime, usegmt=True
+            )
+            headers["If-None-Match"] = etag_path.read_text(encoding="utf-8")
+        except OSError:
+            pass
+
+        response = requests.get(url, headers=headers, stream=True, timeout=30)
+        if response.status_code == 304:
+            response.close()
+            try:
+                return cache_path.open("rb")
+            except OSError:
+                # The cached body is gone: download it again without validators
+                response = requests.get(url, stream=True, timeout=30)
+        response.raise_for_status()
 
-    def fetch_api_data(self) -> Tuple[Dict, Dict]:
+        try:
+            API_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            partial_path = cache_path.with_suffix(".part")
+            partial = partial_path.open("wb")
+        except OSError:
+            # Cache directory not writable: read the response uncached
+            with response:
+                return io.BytesIO(response.content)
+
+        # iter_content decompresses and reports a cut-off body as a
+        # requests error, so the caller falls back to the CLI
+        try:
+            with response, partial:
+                for chunk in response.iter_content(chunk_size=API_CHUNK_SIZE):
+                    partial.write(chunk)
+            partial_path.replace(cache_path)
+        except requests.RequestException:
+            raise  # A subclass of OSError, but a network failure: no retry
+        except OSError:
+            # Disk full or similar halfway through: fetch the body uncached
+            partial_path.unlink(missing_ok=True)
+            with requests.get(url, timeout=30) as retry:
+                retry.raise_for_status()
+                return io.BytesIO(retry.content)
+
+        etag = response.headers.get("ETag")
+        try:
+            if etag:
+                etag_path.write_text(etag, encoding="utf-8")
+            else:
+                etag_path.unlink(missing_ok=True)
+        except OSError:
+            # A stale ETag must not vouch for the new body; plain reuse by
+            # modification time still works without it
+            with contextlib.suppress(OSError):
+                etag_path.unlink(missing_ok=True)
+        return cache_path.open("rb")
+
+    def fetch_api_json(
+        self, url: str, key: str, installed: Set[str]
+    ) -> Dict[str, Dict]:
+        """Load one Homebrew API endpoint, keeping installed records only."""
+        with self.open_api_response(url) as body:
+            if ijson is None:
+                return {
+                    record[key]: record
+                    for record in json_loads(body.read())
+                    if record[key] in installed
+                }
+
+            # Stream the multi-megabyte array and keep only the fields we read
+            return {
+                record[key]: {
+                    field: record[field] for field in API_FIELDS if field in record
+                }
+                for record in ijson.items(body, "item", use_float=True)
+                if record[key] in installed
+            }
+
+    def fetch_api_data(self, installed: Set[str]) -> Tuple[Dict, Dict]:
         """Fetch formula and cask data from Homebrew API."""
         if self._api_cache:
             return self._api_cache["formulas"], self._api_cache["casks"]
@@ -89,24 +410,21 @@ class OptimizedBrewAnalyzer:
         print("Fetching data from Homebrew API...")
 
         try:
-            # Fetch formulas
-            formula_response = requests.get(
-                "https://formulae.brew.sh/api/formula.json", timeout=30
-            )
-            formula_response.raise_for_status()
-            formulas = {f["name"]: f for f in formula_response.json()}
-
-            # Fetch casks
-            cask_response = requests.get(
-                "https://formulae.brew.sh/api/cask.json", timeout=30
-            )
-            cask_response.raise_for_status()
-            casks = {c["token"]: c for c in cask_response.json()}
+            # Download both endpoints concurrently; the fetch is network-bound
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                formula_future = executor.submit(
+                    self.fetch_api_json, FORMULA_API_URL, "name", installed
+                )
+                cask_future = executor.submit(
+                    self.fetch_api_json, CASK_API_URL, "token", installed
+                )
+                formulas = formula_future.result()
+                casks = cask_future.result()
 
             self._api_cache = {"formulas": formulas, "casks": casks}
             return formulas, casks
 
-        except requests.RequestException as e:
+        except API_ERRORS as e:
             print(f"Error fetching API data: {e}", file=sys.stderr)
             print("Falling back to CLI method...", file=sys.stderr)
             return {}, {}
@@ -120,16 +438,16 @@ class OptimizedBrewAnalyzer:
                 if package_name not in casks:
                     return None
                 pkg_data = casks[package_name]
-                description = pkg_data.get("desc", "No description available")
-                url = pkg_data.get("homepage", "")
+                description = pkg_data.get("desc") or "No description available"
+                url = pkg_data.get("homepage") or ""
                 build_deps = []
                 runtime_deps = []
             else:
                 if package_name not in formulas:
                     return None
                 pkg_data = formulas[package_name]
-                description = pkg_data.get("desc", "No description available")
-                url = pkg_data.get("homepage", "")
+                description = pkg_data.get("desc") or "No description available"
+                url = pkg_data.get("homepage") or ""
                 build_deps = pkg_data.get("build_dependencies", [])
                 runtime_deps = pkg_data.get("dependencies", [])
 
@@ -146,7 +464,52 @@ class OptimizedBrewAnalyzer:
             print(f"Error parsing API data for {package_name}: {e}", file=sys.stderr)
             return None
 
-    def parse_brew_info_batch(  # pylint: disable=too-many-branches
+    def read_formula_keg(self, formula_name: str) -> Optional[PackageInfo]:
+        """Read package info for an installed formula directly from the Cellar."""
+        prefix = self.get_brew_prefix()
+        if not prefix:
+            return None
+
+        formula_dir = Path(prefix) / "Cellar" / formula_name
+        try:
+            receipts = sorted(
+                formula_dir.glob("*/INSTALL_RECEIPT.json"),
+                key=lambda p: p.stat().st_mtime,
+            )
+            if not receipts:
+                return None
+            receipt = json_loads(receipts[-1].read_bytes())
+            formula_source = (
+                receipts[-1].parent / ".brew" / f"{formula_name}.rb"
+            ).read_text(encoding="utf-8")
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        # Older receipts lack runtime deps or don't mark which were declared
+        runtime_deps = receipt.get("runtime_dependencies")
+        desc_match = FORMULA_DESC_RE.search(formula_source)
+        if (
+            not desc_match
+            or runtime_deps is None
+            or FORMULA_CONDITIONAL_BLOCK_RE.search(formula_source)
+        ):
+            return None
+        if any("declared_directly" not in dep for dep in runtime_deps):
+            return None
+
+        homepage_match = FORMULA_HOMEPAGE_RE.search(formula_source)
+        return PackageInfo(
+            name=formula_name,
+            description=desc_match.group(1).replace('\\"', '"'),
+            url=homepage_match.group(1) if homepage_match else "",
+            build_dependencies=FORMULA_BUILD_DEP_RE.findall(formula_source),
+            runtime_dependencies=[
+                dep["full_name"] for dep in runtime_deps if dep["declared_directly"]
+            ],
+            is_cask=False,
+        )
+
+    def parse_brew_info_batch(  # pylint: disable=too-many-branches,too-many-locals,too-many-statements
         self, packages: List[Tuple[str, bool]]
     ) -> List[Optional[PackageInfo]]:
         """Parse brew info output for multiple packages at once."""
@@ -159,26 +522,47 @@ class OptimizedBrewAnalyzer:
 
         results = []
 
+        # Start both queries before waiting so the two brew processes overlap
+        formula_process = cask_process = None
+        try:
+            if formulas:
+                formula_process = self.start_brew_command(["info", "--json"] + formulas)
+            if casks:
+                cask_process = self.start_brew_command(
+                    ["info", "--json", "--cask"] + casks
+                )
+        except OSError as e:
+            if e.errno != errno.E2BIG or len(packages) < 2:
+                raise
+            # Argument list still too long for this system: split the batch
+            if formula_process:
+                formula_process.kill()
+                formula_process.communicate()
+            middle = len(packages) // 2
+            return self.parse_brew_info_batch(
+                packages[:middle]
+            ) + self.parse_brew_info_batch(packages[middle:])
+
         # Process formulas in batch
-        if formulas:
-            info_args = ["info", "--json"] + formulas
-            info_output = self.run_brew_command(info_args)
+        if formula_process:
+            info_output = self.finish_brew_command(formula_process)
 
             if info_output:
                 try:
-                    info_data = json.loads(info_output)
+                    info_data = json_loads(info_output)
                     formula_data = {pkg["name"]: pkg for pkg in info_data}
 
                     for formula_name in formulas:
                         if formula_name in formula_data:
                             pkg_data = formula_data[formula_name]
+                            description = (
+                                pkg_data.get("desc") or "No description available"
+                            )
                             results.append(
                                 PackageInfo(
                                     name=formula_name,
-                                    description=pkg_data.get(
-                                        "desc", "No description available"
-                                    ),
-                                    url=pkg_data.get("homepage", ""),
+                                    description=description,
+                                    url=pkg_data.get("homepage") or "",
                                     build_dependencies=pkg_data.get(
                                         "build_dependencies", []
                                     ),
@@ -197,25 +581,25 @@ class OptimizedBrewAnalyzer:
                 results.extend([None] * len(formulas))
 
         # Process casks in batch
-        if casks:
-            info_args = ["info", "--json", "--cask"] + casks
-            info_output = self.run_brew_command(info_args)
+        if cask_process:
+            info_output = self.finish_brew_command(cask_process)
 
             if info_output:
                 try:
-                    info_data = json.loads(info_output)
+                    info_data = json_loads(info_output)
                     cask_data = {pkg["token"]: pkg for pkg in info_data}
 
                     for cask_name in casks:
                         if cask_name in cask_data:
                             pkg_data = cask_data[cask_name]
+                            description = (
+                                pkg_data.get("desc") or "No description available"
+                            )
                             results.append(
                                 PackageInfo(
                                     name=cask_name,
-                                    description=pkg_data.get(
-                                        "desc", "No description available"
-                                    ),
-                                    url=pkg_data.get("homepage", ""),
+                                    description=description,
+                                    url=pkg_data.get("homepage") or "",
                                     build_dependencies=[],
                                     runtime_dependencies=[],
                                     is_cask=True,
@@ -231,36 +615,39 @@ class OptimizedBrewAnalyzer:
 
         return results
 
-    def build_reverse_dependencies(self):
-        """Build reverse dependency mapping."""
-        for pkg_name, pkg_info in self.packages.items():
-            # Add reverse dependencies for build dependencies
-            for dep in pkg_info.build_dependencies:
-                self.reverse_dependencies[dep].add(pkg_name)
-
-            # Add reverse dependencies for runtime dependencies
-            for dep in pkg_info.runtime_dependencies:
-                self.reverse_dependencies[dep].add(pkg_name)
-
     def check_dependency_status(self, dep_name: str) -> str:
         """Check if a dependency is installed and return status symbol."""
         if dep_name in self.installed_packages:
             return "✅"  # Green check
         return "❌"  # Red X
 
-    def format_dependencies(self, dependencies: List[str]) -> str:
+    def format_dependencies(self, dependencies: Iterable[str]) -> str:
         """Format dependencies with status indicators."""
-        if not dependencies:
-            return ""
-
-        formatted_deps = []
-        for dep in dependencies:
-            status = self.check_dependency_status(dep)
-            formatted_deps.append(f"{status} {dep}")
-
-        return ", ".join(formatted_deps)
+        # Same check as check_dependency_status, inlined to skip a call per dep
+        installed = self.installed_packages
+        return ", ".join(
+            f"{'✅' if dep in installed else '❌'} {dep}" for dep in dependencies
+        )
 
-    def analyze_packages(self):
+    def format_package_dependencies(self):
+        """Format every package's dependency lists once for the table."""
+        # Packages often share a dependency list, so format each distinct one
+        # once; the cache is per call so it never outlives installed_packages
+        format_once = lru_cache(maxsize=None)(self.format_dependencies)
+        self._formatted_build_deps = {
+            name: format_once(tuple(deps)) for name, deps in self.build_deps.items()
+        }
+        self._formatted_runtime_deps = {
+            name: format_once(tuple(deps)) for name, deps in self.runtime_deps.items()
+        }
+
+    def effective_batch_size(self, packages: List[Tuple[str, bool]]) -> int:
+        """Limit the batch size so one brew info command line fits in ARG_MAX."""
+        # Each argument costs its bytes, a terminator and an argv pointer
+        longest_name = max(len(name.encode()) for name, _ in packages)
+        return max(1, min(self.batch_size, max_argv_bytes() // (longest_name + 9)))
+
+    def analyze_packages(self):  # pylint: disable=too-many-locals,too-many-branches
         """Main method to analyze all packages with optimizations."""
         start_time = time.time()
 
@@ -278,7 +665,7 @@ class OptimizedBrewAnalyzer:
 
         if self.use_api:
             # Use API method
-            formulas, casks = self.fetch_api_data()
+            formulas, casks = self.fetch_api_data(self.installed_packages)
 
             if formulas or casks:
                 print("Using API data for faster analysis...")
@@ -287,7 +674,7 @@ class OptimizedBrewAnalyzer:
                         package_name, is_cask, formulas, casks
                     )
                     if pkg_info:
-                        self.packages[package_name] = pkg_info
+                        self.add_package(pkg_info)
             else:
                 print("API unavailable, falling back to batch CLI method...")
                 self.use_api = False
@@ -296,27 +683,44 @@ class OptimizedBrewAnalyzer:
             # Use optimized batch CLI method
             print("Using batch CLI queries for faster analysis...")
 
-            # Process packages in batches
-            for i in range(0, len(installed_list), self.batch_size):
-                batch = installed_list[i : i + self.batch_size]
-                batch_end = min(i + self.batch_size, len(installed_list))
-
-                batch_num = i // self.batch_size + 1
-                total_packages = len(installed_list)
-                print(
-                    f"Processing batch {batch_num} ({i+1}-{batch_end}/{total_packages})...",
-                    end="\r",
-                )
-                print("\033[K", end="")  # Clear rest of line
+            # Formulae with a complete keg on disk need no brew info call
+            remaining = []
+            for package in installed_list:
+                pkg_info = None if package[1] else self.read_formula_keg(package[0])
+                if pkg_info:
+                    self.add_package(pkg_info)
+                else:
+                    remaining.append(package)
+
+            # Process the rest in batches, several brew processes at a time
+            batch_size = self.effective_batch_size(remaining) if remaining else 1
+            batches = [
+                remaining[i : i + batch_size]
+                for i in range(0, len(remaining), batch_size)
+            ]
+            max_workers = max(1, min(len(batches), (os.cpu_count() or 1) * 2))
+            total_packages = len(remaining)
+            processed = 0
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                batch_results = executor.map(self.parse_brew_info_batch, batches)
+                for batch_num, (batch, results) in enumerate(
+                    zip(batches, batch_results), 1
+                ):
+                    processed += len(batch)
+                    print(
+                        f"Processed batch {batch_num}/{len(batches)} "
+                        f"({processed}/{total_packages})...",
+                        end="\r",
+                    )
+                    print("\033[K", end="")  # Clear rest of line
 
-                batch_results = self.parse_brew_info_batch(batch)
+                    for pkg_info in results:
+                        if pkg_info:
+                            self.add_package(pkg_info)
 
-                for (package_name, _), pkg_info in zip(batch, batch_results):
-                    if pkg_info:
-                        self.packages[package_name] = pkg_info
-
-        print("\nBuilding dependency relationships...")
-        self.build_reverse_dependencies()
+        print()  # End the progress line
+        self.format_package_dependencies()
 
         elapsed_time = time.time() - start_time
         print(f"Analysis complete in {elapsed_time:.2f} seconds!\n")
@@ -325,15 +729,13 @@ class OptimizedBrewAnalyzer:
         self, output_file: Optional[TextIO] = None
     ):  # pylint: disable=too-many-locals
         """Print the results in a formatted table."""
-        if not self.packages:
+        if not self.descriptions:
             print("No package information available.")
             return
 
         # Calculate column widths
-        max_name_width = max(len(pkg.name) for pkg in self.packages.values())
-        max_desc_width = min(
-            50, max(len(pkg.description) for pkg in self.packages.values())
-        )
+        max_name_width = max(map(len, self.descriptions))
+        max_desc_width = min(50, max(map(len, self.descriptions.values())))
         max_reverse_deps_width = 30
         max_build_deps_width = 40
         max_runtime_deps_width = 40
@@ -342,116 +744,85 @@ class OptimizedBrewAnalyzer:
         max_name_width = max(max_name_width, 12)
         max_desc_width = max(max_desc_width, 20)
 
+        # One format template serves the header and every row
+        row_template = (
+            f"{{:<{max_name_width}}} | "
+            f"{{:<{max_desc_width}}} | "
+            f"{{:<{max_reverse_deps_width}}} | "
+            f"{{:<{max_build_deps_width}}} | "
+            f"{{:<{max_runtime_deps_width}}}"
+        ).format
+
         # Print header
-        header = (
-            f"{'Package':<{max_name_width}} | "
-            f"{'Description':<{max_desc_width}} | "
-            f"{'Used By':<{max_reverse_deps_width}} | "
-            f"{'Build Deps':<{max_build_deps_width}} | "
-            f"{'Runtime Deps':<{max_runtime_deps_width}}"
+        header = row_template(
+            "Package", "Description", "Used By", "Build Deps", "Runtime Deps"
         )
-        print(header)
-        print("-" * len(header))
+        lines = [header, "-" * len(header)]
 
-        if output_file:
-            print(header, file=output_file)
-            print("-" * len(header), file=output_file)
+        # add_package drops the formatted lists, so re-format after any change
+        if not self._formatted_build_deps:
+            self.format_package_dependencies()
+        formatted_build_deps = self._formatted_build_deps
+        formatted_runtime_deps = self._formatted_runtime_deps
 
         # Print package information
-        for pkg_name in sorted(self.packages.keys()):
-            pkg_info = self.packages[pkg_name]
-
-            # Truncate description if too long
-            description = pkg_info.description
-            if len(description) > max_desc_width:
-                description = description[: max_desc_width - 3] + "..."
-
+        for pkg_name in sorted(self.descriptions):
             # Format reverse dependencies
             reverse_deps = list(self.reverse_dependencies.get(pkg_name, set()))
             reverse_deps_str = ", ".join(reverse_deps[:3])  # Show first 3
             if len(reverse_deps) > 3:
                 reverse_deps_str += f" (+{len(reverse_deps)-3} more)"
-            if len(reverse_deps_str) > max_reverse_deps_width:
-                reverse_deps_str = (
-                    reverse_deps_str[: max_reverse_deps_width - 3] + "..."
-                )
-
-            # Format build dependencies
-            build_deps_str = self.format_dependencies(pkg_info.build_dependencies)
-            if len(build_deps_str) > max_build_deps_width:
-                build_deps_str = build_deps_str[: max_build_deps_width - 3] + "..."
-
-            # Format runtime dependencies
-            runtime_deps_str = self.format_dependencies(pkg_info.runtime_dependencies)
-            if len(runtime_deps_str) > max_runtime_deps_width:
-                runtime_deps_str = (
-                    runtime_deps_str[: max_runtime_deps_width - 3] + "..."
-                )
 
-            # Print row
-            row = (
-                f"{pkg_name:<{max_name_width}} | "
-                f"{description:<{max_desc_width}} | "
-                f"{reverse_deps_str:<{max_reverse_deps_width}} | "
-                f"{build_deps_str:<{max_build_deps_width}} | "
-                f"{runtime_deps_str:<{max_runtime_deps_width}}"
+            # Print row, truncating each cell to its column width
+            row = row_template(
+                pkg_name,
+                _truncate(self.descriptions[pkg_name], max_desc_width),
+                _truncate(reverse_deps_str, max_reverse_deps_width),
+                _truncate(formatted_build_deps[pkg_name], max_build_deps_width),
+                _truncate(formatted_runtime_deps[pkg_name], max_runtime_deps_width),
             )
-            print(row)
+            lines.append(row)
 
-            if output_file:
-                print(row, file=output_file)
+        # Emit the whole table with one write per stream
+        _tee_stdout(output_file).write("\n".join(lines) + "\n")
 
     def print_summary(self, output_file: Optional[TextIO] = None):
         """Print summary statistics."""
-        total_packages = len(self.packages)
-        cask_count = sum(1 for pkg in self.packages.values() if pkg.is_cask)
+        total_packages = len(self.descriptions)
+        cask_count = len(self.cask_packages)
         formula_count = total_packages - cask_count
 
-        total_build_deps = sum(
-            len(pkg.build_dependencies) for pkg in self.packages.values()
-        )
-        total_runtime_deps = sum(
-            len(pkg.runtime_dependencies) for pkg in self.packages.values()
-        )
-
-        print("\nSummary:")
-        print(f"  Total packages: {total_packages}")
-        print(f"  Formulas: {formula_count}")
-        print(f"  Casks: {cask_count}")
-        print(f"  Total build dependencies: {total_build_deps}")
-        print(f"  Total runtime dependencies: {total_runtime_deps}")
+        total_build_deps = sum(map(len, self.build_deps.values()))
+        total_runtime_deps = sum(map(len, self.runtime_deps.values()))
 
-        if output_file:
-            print("\nSummary:", file=output_file)
-            print(f"  Total packages: {total_packages}", file=output_file)
-            print(f"  Formulas: {formula_count}", file=output_file)
-            print(f"  Casks: {cask_count}", file=output_file)
-            print(f"  Total build dependencies: {total_build_deps}", file=output_file)
-            print(
-                f"  Total runtime dependencies: {total_runtime_deps}", file=output_file
-            )
+        _tee_stdout(output_file).write(
+            "\nSummary:\n"
+            f"  Total packages: {total_packages}\n"
+            f"  Formulas: {formula_count}\n"
+            f"  Casks: {cask_count}\n"
+            f"  Total build dependencies: {total_build_deps}\n"
+            f"  Total runtime dependencies: {total_runtime_deps}\n"
+        )
 
     def find_root_packages(self) -> Set[str]:
         """Find packages that are not dependencies of any other package."""
         all_dependencies = set()
 
         # Collect all runtime dependencies
-        for pkg_info in self.packages.values():
-            all_dependencies.update(pkg_info.runtime_dependencies)
+        for deps in self.runtime_deps.values():
+            all_dependencies.update(deps)
 
         # Root packages are those that exist but are not dependencies of others
-        root_packages = set(self.packages.keys()) - all_dependencies
+        root_packages = set(self.descriptions) - all_dependencies
         return root_packages
 
     def build_dependency_tree(self) -> Dict[str, List[str]]:
         """Build a tree structure showing runtime dependencies."""
         tree = {}
 
-        for pkg_name, pkg_info in self.packages.items():
+        for pkg_name, deps in self.runtime_deps.items():
             # Only include runtime dependencies that are actually installed
-            installed_deps = [
-                dep for dep in pkg_info.runtime_dependencies if dep in self.packages
-            ]
+            installed_deps = [dep for dep in deps if dep in self.descriptions]
             tree[pkg_name] = installed_deps
 
         return tree
@@ -466,22 +837,17 @@ class OptimizedBrewAnalyzer:
         output_file: Optional[TextIO] = None,
     ):
         """Recursively print the dependency tree for a package."""
+        out = _tee_stdout(output_file)
         if package in visited:
             # Handle circular dependencies
-            line = f"{prefix}{'└── ' if is_last else '├── '}{package} (circular)"
-            print(line)
-            if output_file:
-                print(line, file=output_file)
+            out.write(f"{prefix}{'└── ' if is_last else '├── '}{package} (circular)\n")
             return
 
         visited.add(package)
 
         # Print current package
         status = "✅" if package in self.installed_packages else "❌"
-        line = f"{prefix}{'└── ' if is_last else '├── '}{status} {package}"
-        print(line)
-        if output_file:
-            print(line, file=output_file)
+        out.write(f"{prefix}{'└── ' if is_last else '├── '}{status} {package}\n")
 
         # Get dependencies for this package
         dependencies = tree.get(package, [])
@@ -496,16 +862,12 @@ class OptimizedBrewAnalyzer:
 
     def print_dependency_tree(self, output_file: Optional[TextIO] = None):
         """Print the runtime dependency tree."""
-        if not self.packages:
+        if not self.descriptions:
             print("No package information available.")
             return
 
-        print("\nRuntime Dependency Tree:")
-        print("=" * 50)
-
-        if output_file:
-            print("\nRuntime Dependency Tree:", file=output_file)
-            print("=" * 50, file=output_file)
+        out = _tee_stdout(output_file)
+        out.write("\nRuntime Dependency Tree:\n" + "=" * 50 + "\n")
 
         # Build the dependency tree
         tree = self.build_dependency_tree()
@@ -514,20 +876,15 @@ class OptimizedBrewAnalyzer:
         root_packages = self.find_root_packages()
 
         if not root_packages:
-            print("No root packages found (all packages are dependencies of others)")
-            if output_file:
-                print(
-                    "No root packages found (all packages are dependencies of others)",
-                    file=output_file,
-                )
+            out.write(
+                "No root packages found (all packages are dependencies of others)\n"
+            )
             return
 
         # Sort root packages for consistent output
         sorted_roots = sorted(root_packages)
 
-        print(f"Found {len(sorted_roots)} root packages:\n")
-        if output_file:
-            print(f"Found {len(sorted_roots)} root packages:\n", file=output_file)
+        out.write(f"Found {len(sorted_roots)} root packages:\n\n")
 
         # Print tree for each root package
         for i, root_package in enumerate(sorted_roots):
@@ -536,10 +893,7 @@ class OptimizedBrewAnalyzer:
 
             # Print root package without prefix for the first level
             status = "✅" if root_package in self.installed_packages else "❌"
-            line = f"{status} {root_package}"
-            print(line)
-            if output_file:
-                print(line, file=output_file)
+            out.write(f"{status} {root_package}\n")
 
             # Print its dependencies
             dependencies = tree.get(root_package, [])
@@ -551,9 +905,7 @@ class OptimizedBrewAnalyzer:
 
             # Add spacing between root packages (except for the last one)
             if not is_last_root:
-                print()
-                if output_file:
-                    print(file=output_file)
+                out.write("\n")
 
 
 def main():
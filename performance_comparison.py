@@ -44,7 +44,9 @@ def main():
 
     try:
         # Test original version
-        original_time, original_count = time_analyzer(BrewAnalyzer, "Original Version")
+        original_time, original_count = time_analyzer(
+            BrewAnalyzer, "Original Version", use_cache=False
+        )
 
         # Test optimized batch version
         batch_time, batch_count = time_analyzer(
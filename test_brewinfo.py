@@ -9,10 +9,24 @@ Test script for brewinfo.py
 This script tests the core functionality of the Homebrew analyzer.
 """
 
+import contextlib
 import unittest
 from unittest.mock import patch, MagicMock
+import io
 import json
-from brewinfo import BrewAnalyzer, PackageInfo
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from brewinfo import (
+    BrewAnalyzer,
+    InfoRecordReader,
+    PackageInfo,
+    INFO_CHUNK_SIZE,
+    JSON_ERRORS,
+    MAX_WORKERS,
+    _truncate,
+)
 
 
 class TestBrewAnalyzer(unittest.TestCase):
@@ -20,7 +34,8 @@ class TestBrewAnalyzer(unittest.TestCase):
 
     def setUp(self):
         """Set up test fixtures."""
-        self.analyzer = BrewAnalyzer()
+        with patch("shutil.which", return_value="/opt/homebrew/bin/brew"):
+            self.analyzer = BrewAnalyzer(use_cache=False)
 
     def test_package_info_creation(self):
         """Test PackageInfo dataclass creation."""
@@ -40,6 +55,14 @@ class TestBrewAnalyzer(unittest.TestCase):
         self.assertEqual(pkg.runtime_dependencies, ["openssl", "zlib"])
         self.assertFalse(pkg.is_cask)
 
+    def test_package_info_uses_slots(self):
+        """Test PackageInfo stores fields in slots and keeps its defaults."""
+        pkg = PackageInfo("pkg", "desc", "url", [], [])
+
+        self.assertFalse(pkg.is_cask)
+        self.assertFalse(hasattr(pkg, "__dict__"))
+        self.assertEqual(pkg, PackageInfo("pkg", "desc", "url", [], [], False))
+
     @patch("subprocess.run")
     def test_run_brew_command_success(self, mock_run):
         """Test successful brew command execution."""
@@ -52,24 +75,61 @@ class TestBrewAnalyzer(unittest.TestCase):
 
         self.assertEqual(result, "test output")
         mock_run.assert_called_once_with(
-            ["brew", "list"], capture_output=True, text=True, check=True
+            ["/opt/homebrew/bin/brew", "list"],
+            capture_output=True,
+            text=True,
+            check=True,
         )
 
+    def test_run_brew_command_without_homebrew(self):
+        """Test a missing brew executable is reported before running anything."""
+        with patch("shutil.which", return_value=None):
+            analyzer = BrewAnalyzer(use_cache=False)
+
+        with patch("subprocess.run") as mock_run, patch(
+            "sys.stderr", new_callable=io.StringIO
+        ) as stderr, self.assertRaises(SystemExit):
+            analyzer.run_brew_command(["list"])
+
+        mock_run.assert_not_called()
+        self.assertIn("Homebrew not found", stderr.getvalue())
+
+    def test_get_installed_packages_scans_directories(self):
+        """Test installed packages are listed from the Cellar and Caskroom."""
+        with tempfile.TemporaryDirectory() as tmp:
+            cellar = Path(tmp) / "Cellar"
+            for name in ("zlib", "git", ".keepme"):
+                (cellar / name).mkdir(parents=True)
+            brew_dirs = {"--cellar": cellar, "--caskroom": Path(tmp) / "Caskroom"}
+
+            with patch.object(
+                self.analyzer, "get_brew_dir", side_effect=brew_dirs.get
+            ), patch.object(self.analyzer, "run_brew_command") as mock_brew:
+                installed = self.analyzer.get_installed_packages()
+
+        self.assertEqual(installed, [("git", False), ("zlib", False)])
+        mock_brew.assert_not_called()
+
     def test_parse_brew_info_formula(self):
         """Test parsing brew info JSON for a formula."""
         test_json = json.dumps(
-            [
-                {
-                    "name": "test-formula",
-                    "desc": "Test formula description",
-                    "homepage": "https://test.com",
-                    "build_dependencies": ["cmake"],
-                    "dependencies": ["openssl", "zlib"],
-                }
-            ]
-        )
+            {
+                "formulae": [
+                    {
+                        "name": "test-formula",
+                        "desc": "Test formula description",
+                        "homepage": "https://test.com",
+                        "build_dependencies": ["cmake"],
+                        "dependencies": ["openssl", "zlib"],
+                    }
+                ],
+                "casks": [],
+            }
+        ).encode()
 
-        with patch.object(self.analyzer, "run_brew_command", return_value=test_json):
+        with patch.object(
+            self.analyzer, "run_brew_command_bytes", return_value=test_json
+        ):
             pkg_info = self.analyzer.parse_brew_info("test-formula", False)
 
         self.assertIsNotNone(pkg_info)
@@ -84,16 +144,21 @@ class TestBrewAnalyzer(unittest.TestCase):
     def test_parse_brew_info_cask(self):
         """Test parsing brew info JSON for a cask."""
         test_json = json.dumps(
-            [
-                {
-                    "token": "test-cask",
-                    "desc": "Test cask description",
-                    "homepage": "https://testcask.com",
-                }
-            ]
-        )
+            {
+                "formulae": [],
+                "casks": [
+                    {
+                        "token": "test-cask",
+                        "desc": "Test cask description",
+                        "homepage": "https://testcask.com",
+                    }
+                ],
+            }
+        ).encode()
 
-        with patch.object(self.analyzer, "run_brew_command", return_value=test_json):
+        with patch.object(
+            self.analyzer, "run_brew_command_bytes", return_value=test_json
+        ):
             pkg_info = self.analyzer.parse_brew_info("test-cask", True)
 
         self.assertIsNotNone(pkg_info)
@@ -105,6 +170,229 @@ class TestBrewAnalyzer(unittest.TestCase):
             self.assertEqual(pkg_info.runtime_dependencies, [])
             self.assertTrue(pkg_info.is_cask)
 
+    def test_parse_brew_info_cask_with_null_fields(self):
+        """Test that casks reporting null desc/homepage get the defaults."""
+        records = [{"token": "bare-cask", "desc": None, "homepage": None}]
+
+        (pkg_info,) = self.analyzer.parse_brew_info_records(records, True)
+
+        self.assertEqual(pkg_info.description, "No description available")
+        self.assertEqual(pkg_info.url, "")
+
+        self.analyzer.packages = {"bare-cask": pkg_info}
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            self.analyzer.print_table()
+        self.assertIn("No description available", stdout.getvalue())
+
+    def test_run_brew_commands_batched(self):
+        """Test concurrent brew commands return their outputs in order."""
+        real_popen = subprocess.Popen
+
+        def echo_popen(cmd, **kwargs):
+            return real_popen(["echo"] + cmd[1:], **kwargs)
+
+        arg_lists = [[f"output{i}"] for i in range(MAX_WORKERS + 2)]
+        with patch("subprocess.Popen", side_effect=echo_popen), patch(
+            "sys.stdout", new_callable=io.StringIO
+        ) as stdout:
+            outputs = self.analyzer.run_brew_commands_batched(arg_lists)
+
+        self.assertEqual(outputs, [f"{args[0]}\n".encode() for args in arg_lists])
+        # Progress is throttled to every 10th command plus the final one
+        self.assertEqual(stdout.getvalue().count("\r"), len(arg_lists) // 10 + 1)
+        self.assertIn(f"({len(arg_lists)}/{len(arg_lists)})", stdout.getvalue())
+
+    def test_run_brew_commands_batched_feeds_readers(self):
+        """Test outputs go to the given readers instead of being collected."""
+        real_popen = subprocess.Popen
+        docs = [json.dumps({"formulae": [{"name": f"pkg{i}"}]}) for i in range(3)]
+
+        def echo_popen(cmd, **kwargs):
+            return real_popen(["echo"] + cmd[1:], **kwargs)
+
+        readers = [InfoRecordReader() for _ in docs]
+        with patch("subprocess.Popen", side_effect=echo_popen), patch("sys.stdout"):
+            outputs = self.analyzer.run_brew_commands_batched(
+                [[doc] for doc in docs], readers=readers
+            )
+
+        self.assertEqual(outputs, [b""] * len(docs))
+        self.assertEqual(
+            [reader.records() for reader in readers],
+            [[{"name": f"pkg{i}"}] for i in range(3)],
+        )
+
+    def test_parse_brew_info_records_interns_names(self):
+        """Test dependency names shared across records are one string object."""
+        records = json.loads(
+            '[{"name": "curl", "dependencies": ["openssl@3"]},'
+            ' {"name": "wget", "build_dependencies": ["openssl@3"]}]'
+        )
+
+        curl, wget = self.analyzer.parse_brew_info_records(records, False)
+
+        self.assertIs(curl.runtime_dependencies[0], wget.build_dependencies[0])
+
+    def test_parse_brew_info_bulk_chunks_names(self):
+        """Test bulk info queries are split into argv-sized chunks."""
+        names = [f"pkg{i}" for i in range(INFO_CHUNK_SIZE + 1)]
+
+        def fake_brew(args):
+            records = [
+                {"name": name, "desc": "", "homepage": "", "dependencies": []}
+                for name in args[3:]
+            ]
+            return json.dumps({"formulae": records, "casks": []})
+
+        def fake_batched(arg_lists, label="packages", readers=None):
+            outputs = [fake_brew(args).encode() for args in arg_lists]
+            if readers is None:
+                return outputs
+            for reader, output in zip(readers, outputs):
+                if output:
+                    reader.feed(output)
+            return [b""] * len(arg_lists)
+
+        with patch.object(
+            self.analyzer, "run_brew_commands_batched", side_effect=fake_batched
+        ) as mock_batched:
+            results = self.analyzer.parse_brew_info_bulk(names, False)
+
+        self.assertEqual([pkg.name for pkg in results], names)
+        arg_lists = mock_batched.call_args.args[0]
+        self.assertEqual(len(arg_lists), 2)
+        self.assertEqual(arg_lists[0][:3], ["info", "--json=v2", "--formula"])
+
+    def test_analyze_packages_falls_back_to_single_queries(self):
+        """Test packages missing from a failed bulk query are fetched one by one."""
+
+        def fake_brew(args):
+            if args == ["--cellar"]:
+                return ""
+            names = args[3:]
+            if len(names) > 1:
+                return ""  # brew fails the whole call for one unknown name
+            record = {"name": names[0], "desc": "", "homepage": "", "dependencies": []}
+            return json.dumps({"formulae": [record], "casks": []})
+
+        def fake_batched(arg_lists, label="packages", readers=None):
+            outputs = [fake_brew(args).encode() for args in arg_lists]
+            if readers is None:
+                return outputs
+            for reader, output in zip(readers, outputs):
+                if output:
+                    reader.feed(output)
+            return [b""] * len(arg_lists)
+
+        installed = [("zlib", False), ("git", False)]
+        with patch.object(
+            self.analyzer, "get_installed_packages", return_value=installed
+        ), patch.object(
+            self.analyzer, "run_brew_command", side_effect=fake_brew
+        ), patch.object(
+            self.analyzer, "run_brew_commands_batched", side_effect=fake_batched
+        ):
+            self.analyzer.analyze_packages()
+
+        self.assertEqual(list(self.analyzer.packages), ["git", "zlib"])
+
+    def test_info_cache_roundtrip(self):
+        """Test cached records are reused until the package is reinstalled."""
+        record = {"name": "git", "desc": "Version control", "dependencies": []}
+        analyzer = BrewAnalyzer(use_cache=True)
+
+        with tempfile.TemporaryDirectory() as tmp, patch(
+            "brewinfo.CACHE_DIR", Path(tmp) / "cache"
+        ), patch.object(analyzer, "get_brew_version", return_value="Homebrew 4.0.0"):
+            analyzer.store_cached_info(record, False)
+
+            with patch.object(analyzer, "get_install_mtime", return_value=0.0):
+                self.assertEqual(analyzer.load_cached_info("git", False), record)
+                self.assertIsNone(analyzer.load_cached_info("git", True))
+
+            with patch.object(analyzer, "get_install_mtime", return_value=1e12):
+                self.assertIsNone(analyzer.load_cached_info("git", False))
+
+    def test_read_formula_keg(self):
+        """Test formula info is read from the install receipt and formula file."""
+        receipt = {
+            "runtime_dependencies": [
+                {"full_name": "pcre2", "version": "10.42", "declared_directly": True},
+                {"full_name": "zlib", "version": "1.3", "declared_directly": False},
+            ]
+        }
+        formula_source = (
+            "class Git < Formula\n"
+            '  desc "Distributed revision control system"\n'
+            '  homepage "https://git-scm.com"\n'
+            '  depends_on "gettext" => :build\n'
+            '  depends_on "python@3.13" => [:test, :build]\n'
+            '  depends_on "pcre2"\n'
+            "end\n"
+        )
+        conditional_blocks = {
+            "platform": "  on_linux do\n"
+            '    depends_on "linux-headers@5.15" => :build\n'
+            "  end\n",
+            "head": "  head do\n"
+            '    url "https://github.com/git/git.git"\n'
+            '    depends_on "autoconf" => :build\n'
+            "  end\n",
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            keg = Path(tmp) / "git" / "2.42.0"
+            (keg / ".brew").mkdir(parents=True)
+            (keg / "INSTALL_RECEIPT.json").write_text(json.dumps(receipt))
+            (keg / ".brew" / "git.rb").write_text(formula_source)
+
+            pkg_info = self.analyzer.read_formula_keg(Path(tmp) / "git")
+
+            # Conditional blocks are left to brew, which knows the installed build
+            for kind, block in conditional_blocks.items():
+                with self.subTest(block=kind):
+                    (keg / ".brew" / "git.rb").write_text(
+                        formula_source.replace("end\n", block + "end\n")
+                    )
+                    self.assertIsNone(self.analyzer.read_formula_keg(Path(tmp) / "git"))
+
+        self.assertIsNotNone(pkg_info)
+        if pkg_info is not None:  # Type guard for Pylance
+            self.assertEqual(pkg_info.name, "git")
+            self.assertEqual(
+                pkg_info.description, "Distributed revision control system"
+            )
+            self.assertEqual(pkg_info.url, "https://git-scm.com")
+            self.assertEqual(pkg_info.build_dependencies, ["gettext", "python@3.13"])
+            self.assertEqual(pkg_info.runtime_dependencies, ["pcre2"])
+
+    def test_parse_brew_info_output_malformed(self):
+        """Test malformed brew info output is reported, not raised."""
+        with patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            pkg_info = self.analyzer.parse_brew_info_output("git", b'{"formulae": [')
+
+        self.assertIsNone(pkg_info)
+        self.assertIn("Error parsing info for git", stderr.getvalue())
+
+    def test_read_cask_metadata(self):
+        """Test cask info is read from the newest installed cask JSON."""
+        with tempfile.TemporaryDirectory() as tmp:
+            caskroom = Path(tmp)
+            versions = (("3.4", "Old", 1000), ("3.5", "Terminal emulator", 2000))
+            for version, desc, mtime in versions:
+                casks_dir = caskroom / "iterm2" / ".metadata" / version / "1" / "Casks"
+                casks_dir.mkdir(parents=True)
+                metadata_file = casks_dir / "iterm2.json"
+                metadata_file.write_text(json.dumps({"token": "iterm2", "desc": desc}))
+                os.utime(metadata_file, (mtime, mtime))
+
+            with patch.object(self.analyzer, "get_brew_dir", return_value=caskroom):
+                record = self.analyzer._read_cask_metadata("iterm2")
+                missing = self.analyzer._read_cask_metadata("firefox")
+
+        self.assertEqual(record, {"token": "iterm2", "desc": "Terminal emulator"})
+        self.assertIsNone(missing)
+
     def test_check_dependency_status(self):
         """Test dependency status checking."""
         self.analyzer.installed_packages = {"openssl", "zlib", "cmake"}
@@ -128,6 +416,26 @@ class TestBrewAnalyzer(unittest.TestCase):
         result = self.analyzer.format_dependencies([])
         self.assertEqual(result, "")
 
+    def test_format_dependencies_uses_precomputed_labels(self):
+        """Test labels built from the analyzed packages are reused."""
+        self.analyzer.packages = {
+            "git": PackageInfo("git", "desc", "url", ["gettext"], ["pcre2"]),
+            "pcre2": PackageInfo("pcre2", "desc", "url", [], []),
+        }
+        self.analyzer.installed_packages = frozenset(self.analyzer.packages)
+        self.analyzer.build_dependency_labels()
+
+        self.assertEqual(
+            self.analyzer.format_dependencies(["pcre2", "gettext"]),
+            "✅ pcre2, ❌ gettext",
+        )
+
+        # Labels are fixed at build time; unknown deps are still checked live
+        self.analyzer.installed_packages = frozenset({"zlib"})
+        self.assertEqual(
+            self.analyzer.format_dependencies(["pcre2", "zlib"]), "✅ pcre2, ✅ zlib"
+        )
+
     def test_build_reverse_dependencies(self):
         """Test reverse dependency building."""
         # Set up test packages
@@ -143,6 +451,119 @@ class TestBrewAnalyzer(unittest.TestCase):
         self.assertIn("pkg2", self.analyzer.reverse_dependencies["openssl"])
         self.assertIn("pkg2", self.analyzer.reverse_dependencies["zlib"])
 
+    def test_compute_transitive_users(self):
+        """Test indirect users are collected through the dependency chain."""
+        self.analyzer.packages = {
+            "app": PackageInfo("app", "desc", "url", [], ["lib"]),
+            "lib": PackageInfo("lib", "desc", "url", ["cmake"], ["base"]),
+            "base": PackageInfo("base", "desc", "url", [], []),
+            "cmake": PackageInfo("cmake", "desc", "url", [], ["base"]),
+        }
+        self.analyzer.build_reverse_dependencies()
+
+        users = self.analyzer.compute_transitive_users()
+
+        self.assertEqual(users["base"], {"lib", "cmake", "app"})
+        self.assertEqual(users["cmake"], {"lib", "app"})
+        self.assertEqual(users["lib"], {"app"})
+        self.assertEqual(users["app"], set())
+
+    def test_compute_transitive_users_with_cycle(self):
+        """Test every package in a cycle gets the same users, in any order."""
+        packages = {
+            "a": PackageInfo("a", "desc", "url", [], ["b"]),
+            "b": PackageInfo("b", "desc", "url", [], ["a", "base"]),
+            "app": PackageInfo("app", "desc", "url", [], ["a"]),
+            "base": PackageInfo("base", "desc", "url", [], []),
+        }
+
+        for names in (list(packages), list(reversed(packages))):
+            with self.subTest(order=names):
+                analyzer = BrewAnalyzer(use_cache=False)
+                analyzer.packages = {name: packages[name] for name in names}
+                analyzer.build_reverse_dependencies()
+
+                users = analyzer.compute_transitive_users()
+
+                self.assertEqual(users["a"], {"a", "b", "app"})
+                self.assertEqual(users["b"], {"a", "b", "app"})
+                self.assertEqual(users["base"], {"a", "b", "app"})
+                self.assertEqual(users["app"], set())
+
+    def test_print_table_writes_same_output_to_file(self):
+        """Test the table is written once to stdout and once to the file."""
+        self.analyzer.packages = {
+            "git": PackageInfo("git", "Version control", "url", [], ["pcre2"]),
+            "pcre2": PackageInfo("pcre2", "Regex library", "url", [], []),
+        }
+        self.analyzer.installed_packages = frozenset(self.analyzer.packages)
+        self.analyzer.build_reverse_dependencies()
+
+        stdout, output_file = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.analyzer.print_table(output_file)
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(stdout.getvalue(), output_file.getvalue())
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith("Package "))
+        self.assertTrue(lines[2].startswith("git "))
+        self.assertIn("✅ pcre2", lines[2])
+        self.assertIn("| git ", lines[3])
+
+    def test_print_table_lists_first_users_alphabetically(self):
+        """Test the Used By column shows the first three users in order."""
+        users = ["zsh", "vim", "git", "curl", "bat"]
+        self.analyzer.packages = {
+            name: PackageInfo(name, "desc", "url", [], ["openssl"]) for name in users
+        }
+        self.analyzer.packages["openssl"] = PackageInfo("openssl", "d", "u", [], [])
+        self.analyzer.build_reverse_dependencies()
+
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            self.analyzer.print_table()
+
+        openssl_row = next(
+            line
+            for line in stdout.getvalue().splitlines()
+            if line.startswith("openssl")
+        )
+        self.assertIn("| bat, curl, git (+2 more) ", openssl_row)
+
+
+class TestHelpers(unittest.TestCase):
+    """Test cases for module-level helpers."""
+
+    def test_info_record_reader(self):
+        """Test records are read from output fed in chunks, with or without ijson."""
+        doc = json.dumps(
+            {"formulae": [{"name": "git"}, {"name": "vim"}], "casks": []}
+        ).encode()
+
+        for fallback in (False, True):
+            with self.subTest(fallback=fallback), (
+                patch("brewinfo.ijson", None) if fallback else contextlib.nullcontext()
+            ):
+                reader = InfoRecordReader()
+                for start in range(0, len(doc), 5):
+                    reader.feed(doc[start : start + 5])
+                self.assertEqual(reader.records(), [{"name": "git"}, {"name": "vim"}])
+
+                truncated = InfoRecordReader()
+                truncated.feed(doc[:-10])
+                with self.assertRaises(JSON_ERRORS):
+                    truncated.records()
+
+                truncated.discard()
+                self.assertEqual(truncated.records(), [])
+                self.assertEqual(InfoRecordReader(is_cask=True).records(), [])
+
+    def test_truncate(self):
+        """Test text is cut to the column width with an ellipsis."""
+        self.assertEqual(_truncate("short", 10), "short")
+        self.assertEqual(_truncate("exactly10!", 10), "exactly10!")
+        self.assertEqual(_truncate("much too long", 10), "much to...")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["requests"]
+# ///
+"""
+Test script for brewinfo_optimized.py
+
+This script tests the core functionality of the optimized Homebrew analyzer.
+"""
+
+import contextlib
+import copy
+import errno
+import io
+import json
+import pickle
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+try:
+    import brewinfo_optimized
+    from brewinfo_optimized import (
+        OptimizedBrewAnalyzer,
+        PackageInfo,
+        max_argv_bytes,
+        _Tee,
+        _tee_stdout,
+    )
+except ImportError as exc:  # requests is not installed
+    raise unittest.SkipTest(f"brewinfo_optimized unavailable: {exc}") from exc
+
+
+class TruncatedHandler(BaseHTTPRequestHandler):
+    """Serve a JSON body that stops short of its Content-Length."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Promise a long body, send part of it and hang up."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "1000")
+        self.end_headers()
+        self.wfile.write(b'[{"name": "git", "desc": "Distributed')
+        self.close_connection = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep test output quiet."""
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Serve a fixed JSON body, answering 304 when the client's ETag matches."""
+
+    etag = '"v1"'
+    body = json.dumps([{"name": "git", "desc": "Git"}]).encode()
+    statuses = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Send the body, or 304 Not Modified for a matching If-None-Match."""
+        if self.headers.get("If-None-Match") == self.etag:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep test output quiet."""
+
+
+@contextlib.contextmanager
+def serve(handler):
+    """Run an HTTP server on a free local port and yield its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class TestHelpers(unittest.TestCase):
+    """Test cases for module-level helpers."""
+
+    def test_tee_writes_to_every_stream(self):
+        """Test the tee copies writes to stdout and the output file."""
+        stdout, output_file = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            tee = _tee_stdout(output_file)
+            tee.write("Package | Description\n")
+            self.assertIs(_tee_stdout(None), stdout)
+
+        self.assertIsInstance(tee, _Tee)
+        self.assertEqual(stdout.getvalue(), "Package | Description\n")
+        self.assertEqual(output_file.getvalue(), stdout.getvalue())
+
+    def test_max_argv_bytes(self):
+        """Test the argv budget leaves room for the environment."""
+        with patch("os.sysconf", return_value=262144), patch.dict(
+            "os.environ", {"HOME": "/h"}, clear=True
+        ):
+            self.assertEqual(max_argv_bytes(), 262144 - len("HOME/h") - 2 - 4096)
+
+        with patch("os.sysconf", side_effect=ValueError), patch.dict(
+            "os.environ", {}, clear=True
+        ):
+            self.assertEqual(max_argv_bytes(), 128 * 1024 - 4096)
+
+
+class TestOptimizedBrewAnalyzer(unittest.TestCase):
+    """Test cases for OptimizedBrewAnalyzer class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = OptimizedBrewAnalyzer(use_api=True)
+
+    def test_package_info_copy_and_pickle(self):
+        """Test frozen slotted PackageInfo survives copy and pickle."""
+        pkg = PackageInfo(
+            name="git",
+            description="Distributed revision control system",
+            url="https://git-scm.com",
+            build_dependencies=["gettext"],
+            runtime_dependencies=["pcre2"],
+        )
+
+        self.assertEqual(copy.copy(pkg), pkg)
+        self.assertEqual(copy.deepcopy(pkg), pkg)
+        self.assertEqual(pickle.loads(pickle.dumps(pkg)), pkg)
+        self.assertFalse(hasattr(pkg, "__dict__"))
+
+    def test_packages_is_rebuilt_only_after_add_package(self):
+        """Test the packages view is cached until another package is added."""
+        self.analyzer.add_package(PackageInfo("git", "Git", "url", [], ["pcre2"]))
+        packages = self.analyzer.packages
+
+        self.assertIs(self.analyzer.packages, packages)
+        self.analyzer.add_package(PackageInfo("pcre2", "Regex", "url", [], []))
+        self.assertEqual(list(self.analyzer.packages), ["git", "pcre2"])
+        self.assertEqual(self.analyzer.packages["git"].runtime_dependencies, ["pcre2"])
+
+    def test_add_package_records_reverse_dependencies(self):
+        """Test adding a package registers it as a user of its dependencies."""
+        self.analyzer.add_package(
+            PackageInfo("git", "Git", "url", ["gettext"], ["pcre2"])
+        )
+        self.analyzer.add_package(PackageInfo("wget", "Wget", "url", [], ["pcre2"]))
+
+        self.assertEqual(self.analyzer.reverse_dependencies["pcre2"], {"git", "wget"})
+        self.assertEqual(self.analyzer.reverse_dependencies["gettext"], {"git"})
+        self.assertNotIn("git", self.analyzer.reverse_dependencies)
+
+    def test_print_table_reformats_replaced_package(self):
+        """Test re-adding a package shows its new dependencies in the table."""
+        self.analyzer.installed_packages = {"p", "x", "y"}
+        self.analyzer.add_package(PackageInfo("p", "P", "url", [], ["x"]))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.analyzer.print_table()
+
+        self.analyzer.add_package(PackageInfo("p", "P", "url", [], ["y"]))
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.analyzer.print_table()
+
+        self.assertIn("✅ y", stdout.getvalue())
+        self.assertNotIn("✅ x", stdout.getvalue())
+
+    def test_topological_order_without_graphlib(self):
+        """Test the Kahn fallback puts dependencies before their users."""
+        self.analyzer.add_package(PackageInfo("git", "Git", "url", [], ["pcre2"]))
+        self.analyzer.add_package(PackageInfo("pcre2", "Regex", "url", [], []))
+        self.analyzer.add_package(PackageInfo("tig", "Tig", "url", ["git"], []))
+
+        with patch.object(brewinfo_optimized, "TopologicalSorter", None):
+            order = self.analyzer.topological_order()
+
+        self.assertEqual(order, ("pcre2", "git", "tig"))
+
+    def test_topological_order_with_cycle(self):
+        """Test packages in a dependency cycle are still placed, last."""
+        self.analyzer.add_package(PackageInfo("a", "A", "url", [], ["b"]))
+        self.analyzer.add_package(PackageInfo("b", "B", "url", [], ["a"]))
+        self.analyzer.add_package(PackageInfo("c", "C", "url", [], []))
+
+        self.assertEqual(self.analyzer.topological_order(), ("c", "a", "b"))
+
+    def test_parse_brew_info_batch_splits_on_e2big(self):
+        """Test a batch whose argument list is too long is split in halves."""
+        started = []
+
+        def start(args):
+            names = args[2:]
+            if len(names) > 1:
+                raise OSError(errno.E2BIG, "Argument list too long")
+            started.append(names)
+            return names
+
+        def finish(names):
+            return json.dumps([{"name": name, "desc": name.upper()} for name in names])
+
+        packages = [(name, False) for name in ("git", "pcre2", "wget")]
+        with patch.object(
+            self.analyzer, "start_brew_command", side_effect=start
+        ), patch.object(self.analyzer, "finish_brew_command", side_effect=finish):
+            results = self.analyzer.parse_brew_info_batch(packages)
+
+        self.assertEqual(started, [["git"], ["pcre2"], ["wget"]])
+        self.assertEqual([pkg.name for pkg in results], ["git", "pcre2", "wget"])
+        self.assertEqual(results[1].description, "PCRE2")
+
+    def test_open_api_response_reuses_cache_on_304(self):
+        """Test a matching ETag serves the cached body without a new download."""
+        ETagHandler.statuses = []
+        with tempfile.TemporaryDirectory() as tmp, serve(ETagHandler) as url:
+            with patch.object(brewinfo_optimized, "API_CACHE_DIR", Path(tmp)):
+                with OptimizedBrewAnalyzer.open_api_response(
+                    f"{url}/formula.json"
+                ) as body:
+                    first = body.read()
+                with OptimizedBrewAnalyzer.open_api_response(
+                    f"{url}/formula.json"
+                ) as body:
+                    second = body.read()
+
+            etag = (Path(tmp) / "formula.etag").read_text(encoding="utf-8")
+
+        self.assertEqual(ETagHandler.statuses, [200, 304])
+        self.assertEqual(etag, ETagHandler.etag)
+        self.assertEqual(first, ETagHandler.body)
+        self.assertEqual(second, ETagHandler.body)
+
+    def test_open_api_response_refetches_missing_cache_body(self):
+        """Test a 304 whose cached body can't be opened downloads it again."""
+        real_open = Path.open
+        missing = []
+
+        def open_vanished_cache(path, mode="r", **kwargs):
+            if mode == "rb" and not missing:
+                missing.append(path)  # Deleted between validation and reading
+                raise FileNotFoundError(path)
+            return real_open(path, mode, **kwargs)
+
+        ETagHandler.statuses = []
+        with tempfile.TemporaryDirectory() as tmp, serve(ETagHandler) as url:
+            with patch.object(brewinfo_optimized, "API_CACHE_DIR", Path(tmp)):
+                (Path(tmp) / "formula.json").write_bytes(ETagHandler.body)
+                (Path(tmp) / "formula.etag").write_text(ETagHandler.etag)
+                with patch.object(
+                    Path, "open", autospec=True, side_effect=open_vanished_cache
+                ), OptimizedBrewAnalyzer.open_api_response(
+                    f"{url}/formula.json"
+                ) as body:
+                    refetched = body.read()
+
+        self.assertEqual(missing, [Path(tmp) / "formula.json"])
+        self.assertEqual(ETagHandler.statuses, [304, 200])
+        self.assertEqual(refetched, ETagHandler.body)
+
+    def test_open_api_response_survives_unwritable_etag(self):
+        """Test failing to save the ETag still returns the downloaded body."""
+        ETagHandler.statuses = []
+        with tempfile.TemporaryDirectory() as tmp, serve(ETagHandler) as url:
+            with patch.object(brewinfo_optimized, "API_CACHE_DIR", Path(tmp)):
+                with patch.object(
+                    Path, "write_text", side_effect=OSError
+                ), OptimizedBrewAnalyzer.open_api_response(
+                    f"{url}/formula.json"
+                ) as body:
+                    downloaded = body.read()
+
+            etag_saved = (Path(tmp) / "formula.etag").exists()
+
+        self.assertEqual(downloaded, ETagHandler.body)
+        self.assertFalse(etag_saved)
+
+    def test_read_formula_keg(self):
+        """Test formula info is read from the Cellar receipt and formula file."""
+        receipt = {
+            "runtime_dependencies": [
+                {"full_name": "pcre2", "version": "10.42", "declared_directly": True},
+                {"full_name": "zlib", "version": "1.3", "declared_directly": False},
+            ]
+        }
+        formula_source = (
+            "class Git < Formula\n"
+            '  desc "Distributed revision control system"\n'
+            '  homepage "https://git-scm.com"\n'
+            '  depends_on "gettext" => :build\n'
+            '  depends_on "python@3.13" => [:test, :build]\n'
+            '  depends_on "pcre2"\n'
+            "end\n"
+        )
+        conditional_blocks = {
+            "platform": "  on_linux do\n"
+            '    depends_on "linux-headers@5.15" => :build\n'
+            "  end\n",
+            "head": "  head do\n"
+            '    url "https://github.com/git/git.git"\n'
+            '    depends_on "autoconf" => :build\n'
+            "  end\n",
+        }
+
+        with tempfile.TemporaryDirectory() as tmp:
+            keg = Path(tmp) / "Cellar" / "git" / "2.42.0"
+            (keg / ".brew").mkdir(parents=True)
+            (keg / "INSTALL_RECEIPT.json").write_text(json.dumps(receipt))
+            (keg / ".brew" / "git.rb").write_text(formula_source)
+            self.analyzer._brew_prefix = tmp  # pylint: disable=protected-access
+
+            pkg_info = self.analyzer.read_formula_keg("git")
+            missing_info = self.analyzer.read_formula_keg("vim")
+
+            # Conditional blocks are left to brew, which knows the installed build
+            for kind, block in conditional_blocks.items():
+                with self.subTest(block=kind):
+                    (keg / ".brew" / "git.rb").write_text(
+                        formula_source.replace("end\n", block + "end\n")
+                    )
+                    self.assertIsNone(self.analyzer.read_formula_keg("git"))
+
+        self.assertIsNone(missing_info)
+        self.assertEqual(
+            pkg_info,
+            PackageInfo(
+                name="git",
+                description="Distributed revision control system",
+                url="https://git-scm.com",
+                build_dependencies=["gettext", "python@3.13"],
+                runtime_dependencies=["pcre2"],
+            ),
+        )
+
+    @unittest.skipIf(brewinfo_optimized.ijson is None, "ijson is not installed")
+    def test_fetch_api_json_streams_read_fields(self):
+        """Test streamed API records keep only the fields that are read."""
+        records = [
+            {"name": "git", "desc": "Git", "versions": {"stable": "2.42.0"}},
+            {"name": "vim", "desc": "Vim", "versions": {"stable": "9.0"}},
+        ]
+        body = json.dumps(records).encode()
+        with patch.object(
+            OptimizedBrewAnalyzer, "open_api_response", return_value=io.BytesIO(body)
+        ):
+            formulas = self.analyzer.fetch_api_json("formula.json", "name", {"git"})
+
+        self.assertEqual(formulas, {"git": {"name": "git", "desc": "Git"}})
+
+    def test_fetch_api_json_keeps_installed_packages(self):
+        """Test API records for packages that are not installed are dropped."""
+        records = [
+            {"name": "git", "desc": "Git", "versions": {"stable": "2.42.0"}},
+            {"name": "vim", "desc": "Vim", "versions": {"stable": "9.0"}},
+        ]
+        body = json.dumps(records).encode()
+        for ijson_module in (brewinfo_optimized.ijson, None):
+            with self.subTest(ijson=ijson_module), patch.object(
+                brewinfo_optimized, "ijson", ijson_module
+            ), patch.object(
+                OptimizedBrewAnalyzer,
+                "open_api_response",
+                return_value=io.BytesIO(body),
+            ):
+                formulas = self.analyzer.fetch_api_json(
+                    "formula.json", "name", {"vim", "zsh"}
+                )
+
+            self.assertEqual(list(formulas), ["vim"])
+
+    def test_list_brew_dir(self):
+        """Test kegs are listed from the prefix, falling back to brew list."""
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("wget", "git", ".metadata"):
+                (Path(tmp) / "Cellar" / name).mkdir(parents=True)
+            (Path(tmp) / "Cellar" / "README").write_text("not a keg")
+            self.analyzer._brew_prefix = tmp  # pylint: disable=protected-access
+
+            with patch.object(
+                self.analyzer, "run_brew_command", return_value="firefox\nslack"
+            ) as run_brew:
+                formulas = self.analyzer.list_brew_dir("Cellar", "--formula")
+                casks = self.analyzer.list_brew_dir("Caskroom", "--cask")
+
+        self.assertEqual(formulas, ["git", "wget"])
+        self.assertEqual(casks, ["firefox", "slack"])
+        run_brew.assert_called_once_with(["list", "--cask"])
+
+    def test_format_package_dependencies_shares_strings(self):
+        """Test identical dependency lists are formatted once and shared."""
+        self.analyzer.installed_packages = {"git", "vim", "pcre2"}
+        self.analyzer.add_package(PackageInfo("git", "Git", "url", [], ["pcre2"]))
+        self.analyzer.add_package(PackageInfo("vim", "Vim", "url", [], ["pcre2"]))
+
+        self.analyzer.format_package_dependencies()
+        # pylint: disable=protected-access
+        formatted = self.analyzer._formatted_runtime_deps
+        self.assertEqual(formatted["git"], "✅ pcre2")
+        self.assertIs(formatted["git"], formatted["vim"])
+
+        # Each call starts a new cache, so changed install state is picked up
+        self.analyzer.installed_packages = {"git", "vim"}
+        self.analyzer.format_package_dependencies()
+        self.assertEqual(self.analyzer._formatted_runtime_deps["git"], "❌ pcre2")
+
+    def test_effective_batch_size_fits_argv(self):
+        """Test batches shrink so the longest names still fit the argv limit."""
+        self.analyzer.batch_size = 50
+        packages = [("git", False), ("a" * 91, False)]
+
+        with patch.object(brewinfo_optimized, "max_argv_bytes", return_value=1000):
+            self.assertEqual(self.analyzer.effective_batch_size(packages), 10)
+        with patch.object(brewinfo_optimized, "max_argv_bytes", return_value=10**6):
+            self.assertEqual(self.analyzer.effective_batch_size(packages), 50)
+        with patch.object(brewinfo_optimized, "max_argv_bytes", return_value=10):
+            self.assertEqual(self.analyzer.effective_batch_size(packages), 1)
+
+    def test_truncated_api_download_falls_back_to_cli(self):
+        """Test a body cut off mid-download makes the API fetch give up."""
+        with tempfile.TemporaryDirectory() as tmp, serve(TruncatedHandler) as url:
+            with patch.object(
+                brewinfo_optimized, "API_CACHE_DIR", Path(tmp)
+            ), patch.object(
+                brewinfo_optimized, "FORMULA_API_URL", f"{url}/formula.json"
+            ), patch.object(
+                brewinfo_optimized, "CASK_API_URL", f"{url}/cask.json"
+            ), patch(
+                "sys.stdout"
+            ), patch(
+                "sys.stderr"
+            ):
+                result = self.analyzer.fetch_api_data({"git"})
+
+            self.assertFalse((Path(tmp) / "formula.json").exists())
+
+        self.assertEqual(result, ({}, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()